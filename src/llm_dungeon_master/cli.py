@@ -907,7 +907,7 @@ def stats_leaderboard(
     
     with DBSession(engine) as db:
         tracker = StatisticsTracker(db)
-        rankings = tracker.get_leaderboard(session_id, metric)
+        rankings = tracker.get_leaderboard(session_id, metric, limit=10)
         
         if not rankings:
             console.print("[yellow]No data for leaderboard[/yellow]")
@@ -918,8 +918,8 @@ def stats_leaderboard(
         table.add_column("Player", style="green")
         table.add_column("Count", style="yellow")
         
-        for i, entry in enumerate(rankings[:10], 1):
-            table.add_row(str(i), entry['player'], str(entry['count']))
+        for entry in rankings:
+            table.add_row(str(entry['rank']), entry['player'], str(entry['count']))
         
         console.print(table)
 
@@ -1,6 +1,7 @@
 """LLM provider abstraction for different AI backends."""
 
 from abc import ABC, abstractmethod
+from functools import cache
 from typing import AsyncIterator
 import openai
 from .config import settings
@@ -106,16 +107,23 @@ class MockProvider(LLMProvider):
             yield word + " "
 
 
-def get_llm_provider() -> LLMProvider:
-    """Get the configured LLM provider."""
-    if settings.llm_provider == "openai":
-        if not settings.openai_api_key:
+@cache
+def _build_llm_provider(provider: str, api_key: str, model: str) -> LLMProvider:
+    """Build an LLM provider, reusing the instance for identical configuration."""
+    if provider == "openai":
+        if not api_key:
             raise ValueError("OPENAI_API_KEY must be set when using OpenAI provider")
-        return OpenAIProvider(
-            api_key=settings.openai_api_key,
-            model=settings.openai_model
-        )
-    elif settings.llm_provider == "mock":
+        return OpenAIProvider(api_key=api_key, model=model)
+    elif provider == "mock":
         return MockProvider()
     else:
-        raise ValueError(f"Unknown LLM provider: {settings.llm_provider}")
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def get_llm_provider() -> LLMProvider:
+    """Get the configured LLM provider."""
+    return _build_llm_provider(
+        settings.llm_provider,
+        settings.openai_api_key,
+        settings.openai_model
+    )
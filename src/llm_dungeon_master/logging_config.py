@@ -8,10 +8,11 @@ import logging
 import logging.handlers
 import os
 import sys
-from datetime import datetime
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, ClassVar, Dict, Optional, Tuple
 
+import orjson
 import structlog
 
 
@@ -26,6 +27,15 @@ def get_log_format() -> str:
     return os.getenv("LOG_FORMAT", "pretty").lower()
 
 
+def orjson_dumps(event_dict: Dict[str, Any], default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize a log event with orjson for structlog's JSONRenderer.
+    
+    Returns str rather than bytes because records are handed on to the
+    standard library logging handlers.
+    """
+    return orjson.dumps(event_dict, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 def setup_logging() -> None:
     """Configure logging based on environment settings.
     
@@ -51,7 +61,7 @@ def setup_logging() -> None:
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=orjson_dumps),
         ]
     else:
         # Development: Pretty console logging
@@ -121,9 +131,11 @@ def get_logger(name: str) -> structlog.BoundLogger:
 class HealthCheckLogger:
     """Logger for health check and monitoring endpoints."""
     
+    # Monotonic process start reference shared by all instances (nanoseconds)
+    _start_time: ClassVar[int] = time.monotonic_ns()
+    
     def __init__(self):
         self.logger = get_logger("health_check")
-        self._start_time = datetime.now()
     
     def log_health_check(self, component: str, status: str, details: Dict[str, Any]) -> None:
         """Log a health check result.
@@ -138,22 +150,34 @@ class HealthCheckLogger:
             component=component,
             status=status,
             details=details,
-            uptime_seconds=(datetime.now() - self._start_time).total_seconds(),
+            uptime_seconds=(time.monotonic_ns() - self._start_time) / 1_000_000_000,
         )
     
-    def log_metric(self, metric_name: str, value: float, tags: Dict[str, str] = None) -> None:
+    def log_metric(
+        self,
+        metric_name: str,
+        value: float,
+        tags: Optional[Tuple[Tuple[str, str], ...] | Dict[str, str]] = None,
+    ) -> None:
         """Log a metric value.
         
+        Tags are given as ``(key, value)`` pairs so hot call sites can pass a
+        constant tuple; a dict is still accepted. They are only turned into
+        the logged mapping when the record will actually be emitted.
+        
         Args:
             metric_name: Name of the metric
             value: Metric value
-            tags: Optional tags for the metric
+            tags: Optional tags for the metric as (key, value) pairs
         """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
         self.logger.info(
             "metric",
             metric_name=metric_name,
             value=value,
-            tags=tags or {},
+            tags=dict(tags or ()),
         )
 
 
@@ -220,6 +244,25 @@ class LLMLogger:
     
     def __init__(self):
         self.logger = get_logger("llm")
+        # Loggers with the stable provider/model context pre-bound
+        self._request_loggers: Dict[tuple[str, str], Any] = {}
+    
+    def _get_request_logger(self, provider: str, model: str) -> Any:
+        """Get a logger bound to a provider and model, reusing it across requests.
+        
+        Args:
+            provider: LLM provider name
+            model: Model name
+            
+        Returns:
+            Bound structlog logger
+        """
+        key = (provider, model)
+        logger = self._request_loggers.get(key)
+        if logger is None:
+            logger = self.logger.bind(provider=provider, model=model)
+            self._request_loggers[key] = logger
+        return logger
     
     def log_llm_request(
         self,
@@ -240,10 +283,12 @@ class LLMLogger:
             duration_ms: Request duration in milliseconds
             cost_usd: Optional cost in USD
         """
-        self.logger.info(
+        # Skip building the event payload when INFO records would be dropped
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
+        self._get_request_logger(provider, model).info(
             "llm_request",
-            provider=provider,
-            model=model,
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=prompt_tokens + completion_tokens,
@@ -2,6 +2,7 @@
 
 from datetime import datetime, UTC
 from typing import Optional
+from sqlalchemy import Index, event
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -120,6 +121,13 @@ class Character(SQLModel, table=True):
 class Message(SQLModel, table=True):
     """A message in a game session."""
     
+    __table_args__ = (
+        # History pages: filter by session, order/range on time
+        Index("ix_message_session_created", "session_id", "created_at"),
+        # Sender/type filters and per-sender/type counts within a session
+        Index("ix_message_session_sender_type", "session_id", "sender_name", "message_type"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     session_id: int = Field(foreign_key="session.id", index=True)
     sender_name: str
@@ -333,3 +341,47 @@ class ReconnectionToken(SQLModel, table=True):
     expires_at: datetime
     used_at: Optional[datetime] = None
     is_valid: bool = Field(default=True)
+
+
+# Full-text index over Message.content (SQLite only). The FTS5 table stores no
+# copy of the text; triggers keep it in sync with the message table.
+MESSAGE_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+        content, content='message', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS message_fts_ai AFTER INSERT ON message BEGIN
+        INSERT INTO message_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS message_fts_ad AFTER DELETE ON message BEGIN
+        INSERT INTO message_fts(message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS message_fts_au AFTER UPDATE ON message BEGIN
+        INSERT INTO message_fts(message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO message_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+)
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def create_message_fts(target, connection, **kw):
+    """Create the message full-text index alongside the regular tables."""
+    if connection.dialect.name != "sqlite":
+        return
+    
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_fts'"
+    ).first()
+    for statement in MESSAGE_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        # Index messages written before the FTS table existed
+        connection.exec_driver_sql("INSERT INTO message_fts(message_fts) VALUES ('rebuild')")
+
+
+@event.listens_for(SQLModel.metadata, "before_drop")
+def drop_message_fts(target, connection, **kw):
+    """Drop the message full-text index together with the regular tables."""
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS message_fts")
@@ -2,9 +2,10 @@
 
 from datetime import datetime, UTC, timedelta
 from typing import Optional, List, Dict
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session as DBSession, select
 
-from .models import PlayerPresence, SessionPlayer, Player
+from .models import PlayerPresence, SessionPlayer
 
 
 class PresenceStatus:
@@ -164,12 +165,20 @@ class PresenceManager:
         Returns:
             Dictionary with player presence information
         """
-        # Get all players in session
+        # Get all players in session, loading player rows in one extra query
         session_players_stmt = select(SessionPlayer).where(
             SessionPlayer.session_id == session_id
-        )
+        ).options(selectinload(SessionPlayer.player))
         session_players = list(self.db.exec(session_players_stmt).all())
         
+        # Get the latest presence per player with a single query
+        presence_stmt = select(PlayerPresence).where(
+            PlayerPresence.session_id == session_id
+        ).order_by(PlayerPresence.last_heartbeat.desc())
+        latest_presence: Dict[int, PlayerPresence] = {}
+        for presence in self.db.exec(presence_stmt).all():
+            latest_presence.setdefault(presence.player_id, presence)
+        
         players_info = []
         online_count = 0
         away_count = 0
@@ -177,16 +186,12 @@ class PresenceManager:
         
         for sp in session_players:
             # Get player details
-            player = self.db.get(Player, sp.player_id)
+            player = sp.player
             if not player:
                 continue
             
             # Get presence
-            presence_stmt = select(PlayerPresence).where(
-                PlayerPresence.session_id == session_id,
-                PlayerPresence.player_id == sp.player_id
-            ).order_by(PlayerPresence.last_heartbeat.desc())
-            presence = self.db.exec(presence_stmt).first()
+            presence = latest_presence.get(sp.player_id)
             
             status = PresenceStatus.OFFLINE
             last_seen = None
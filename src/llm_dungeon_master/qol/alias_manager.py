@@ -1,15 +1,16 @@
 """Command alias management for shortcuts."""
 
-import json
+import orjson
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, Optional, List
 
 
 class AliasManager:
     """Manages command aliases and shortcuts."""
     
-    # Default aliases
-    DEFAULT_ALIASES = {
+    # Default aliases (read-only, shared by every instance)
+    DEFAULT_ALIASES = MappingProxyType({
         # Movement
         "n": "move north",
         "s": "move south",
@@ -52,7 +53,20 @@ class AliasManager:
         "h": "help",
         "?": "help",
         "??": "help all",
-    }
+    })
+    
+    # Display groups for format_aliases, split once at import
+    ALIAS_CATEGORIES = MappingProxyType({
+        "movement": ("n", "s", "e", "w", "ne", "nw", "se", "sw", "u", "d"),
+        "actions": ("i", "inv", "l", "ex", "atk", "def"),
+        "dice": ("r", "r20", "adv", "dis"),
+        "character": ("hp", "ac", "stats", "char"),
+        "session": ("save", "load", "exit", "quit"),
+        "help": ("h", "?", "??"),
+    })
+    CATEGORIZED_ALIASES = frozenset(
+        alias for aliases in ALIAS_CATEGORIES.values() for alias in aliases
+    )
     
     def __init__(self, config_dir: Optional[Path] = None):
         """Initialize alias manager.
@@ -65,15 +79,15 @@ class AliasManager:
         self.alias_file = self.config_dir / "aliases.json"
         
         # Load aliases
-        self.aliases = self.DEFAULT_ALIASES.copy()
+        self.aliases = dict(self.DEFAULT_ALIASES)
         self.load_aliases()
     
     def load_aliases(self):
         """Load custom aliases from config file."""
         if self.alias_file.exists():
             try:
-                with open(self.alias_file, 'r') as f:
-                    custom = json.load(f)
+                with open(self.alias_file, 'rb') as f:
+                    custom = orjson.loads(f.read())
                     self.aliases.update(custom)
             except Exception:
                 pass
@@ -81,13 +95,10 @@ class AliasManager:
     def save_aliases(self):
         """Save custom aliases to config file."""
         # Only save non-default aliases
-        custom = {
-            k: v for k, v in self.aliases.items()
-            if k not in self.DEFAULT_ALIASES or v != self.DEFAULT_ALIASES.get(k)
-        }
+        custom = self._custom_aliases()
         
-        with open(self.alias_file, 'w') as f:
-            json.dump(custom, f, indent=2)
+        with open(self.alias_file, 'wb') as f:
+            f.write(orjson.dumps(custom, option=orjson.OPT_INDENT_2))
     
     def add_alias(self, alias: str, command: str) -> bool:
         """Add or update an alias.
@@ -138,17 +149,15 @@ class AliasManager:
         if not parts:
             return command
         
-        first_word = parts[0].lower()
-        rest = parts[1] if len(parts) > 1 else ""
-        
-        if first_word in self.aliases:
-            expanded = self.aliases[first_word]
-            if rest:
-                # If alias has parameters, append them
-                return f"{expanded} {rest}"
-            return expanded
+        # Single hash lookup on the first word; no scan over the aliases
+        expanded = self.aliases.get(parts[0].lower())
+        if expanded is None:
+            return command
         
-        return command
+        if len(parts) > 1:
+            # If alias has parameters, append them
+            return f"{expanded} {parts[1]}"
+        return expanded
     
     def get_alias(self, alias: str) -> Optional[str]:
         """Get the command for an alias.
@@ -173,14 +182,19 @@ class AliasManager:
         if include_defaults:
             return self.aliases.copy()
         else:
-            return {
-                k: v for k, v in self.aliases.items()
-                if k not in self.DEFAULT_ALIASES or v != self.DEFAULT_ALIASES.get(k)
-            }
+            return self._custom_aliases()
+    
+    def _custom_aliases(self) -> Dict[str, str]:
+        """Aliases that are new or differ from their default command."""
+        defaults = self.DEFAULT_ALIASES
+        return {
+            k: v for k, v in self.aliases.items()
+            if defaults.get(k) != v
+        }
     
     def reset_aliases(self):
         """Reset to default aliases only."""
-        self.aliases = self.DEFAULT_ALIASES.copy()
+        self.aliases = dict(self.DEFAULT_ALIASES)
         if self.alias_file.exists():
             self.alias_file.unlink()
     
@@ -194,8 +208,8 @@ class AliasManager:
             Number of aliases imported
         """
         try:
-            with open(filepath, 'r') as f:
-                imported = json.load(f)
+            with open(filepath, 'rb') as f:
+                imported = orjson.loads(f.read())
             
             count = 0
             for alias, command in imported.items():
@@ -220,8 +234,8 @@ class AliasManager:
         try:
             aliases = self.list_aliases(include_defaults=not custom_only)
             
-            with open(filepath, 'w') as f:
-                json.dump(aliases, f, indent=2)
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(aliases, option=orjson.OPT_INDENT_2))
             
             return True
         except Exception:
@@ -236,16 +250,12 @@ class AliasManager:
         Returns:
             Formatted alias list
         """
+        return self._render_aliases(category)
+    
+    def _render_aliases(self, category: Optional[str]) -> str:
+        """Build the alias listing shown by format_aliases."""
         lines = ["=== COMMAND ALIASES ===\n"]
-        
-        categories = {
-            "movement": ["n", "s", "e", "w", "ne", "nw", "se", "sw", "u", "d"],
-            "actions": ["i", "inv", "l", "ex", "atk", "def"],
-            "dice": ["r", "r20", "adv", "dis"],
-            "character": ["hp", "ac", "stats", "char"],
-            "session": ["save", "load", "exit", "quit"],
-            "help": ["h", "?", "??"]
-        }
+        categories = self.ALIAS_CATEGORIES
         
         if category and category in categories:
             lines.append(f"{category.title()} Aliases:")
@@ -264,7 +274,7 @@ class AliasManager:
             if custom:
                 lines.append("\nCustom:")
                 for alias, command in sorted(custom.items()):
-                    if alias not in sum(categories.values(), []):
+                    if alias not in self.CATEGORIZED_ALIASES:
                         lines.append(f"  {alias:10} -> {command}")
         
         lines.append(f"\nTotal: {len(self.aliases)} aliases")
@@ -1,11 +1,72 @@
 """Message history management with search and scrollback."""
 
-from typing import List, Optional, Dict
+import io
+import orjson
+from functools import lru_cache
+from typing import List, Optional, Dict, TextIO
 from datetime import datetime, UTC
-from sqlmodel import Session as DBSession, select, or_, and_
+from sqlalchemy import column, delete, literal_column, table
+from sqlmodel import Session as DBSession, select, or_, and_, func
 
 from ..models import Message
 
+# Full-text index created next to the message table on SQLite (see models)
+MESSAGE_FTS = table("message_fts", column("rowid"))
+
+# One Markdown section per message: sender, timestamp, type, content
+_MD_ROW = "\n## %s (%s)\n*Type: %s*\n\n%s\n\n---\n"
+
+
+@lru_cache(maxsize=64)
+def _fts_query(query: str) -> str:
+    """Build an FTS5 query matching every term of ``query`` as a prefix."""
+    terms = query.split()
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def summarize_messages(db: DBSession, session_id: int) -> Dict:
+    """Count a session's messages by sender and type in one grouped query.
+    
+    Args:
+        db: Database session
+        session_id: Session ID
+        
+    Returns:
+        Dictionary with total, per-sender and per-type counts, and the first
+        and last message timestamps (None when no message has one)
+    """
+    stmt = select(
+        Message.sender_name,
+        Message.message_type,
+        func.count(),
+        func.min(Message.created_at),
+        func.max(Message.created_at)
+    ).where(
+        Message.session_id == session_id
+    ).group_by(Message.sender_name, Message.message_type)
+    
+    by_sender = {}
+    by_type = {}
+    firsts = []
+    lasts = []
+    
+    for sender_name, message_type, count, first, last in db.exec(stmt):
+        by_sender[sender_name] = by_sender.get(sender_name, 0) + count
+        by_type[message_type] = by_type.get(message_type, 0) + count
+        # MIN/MAX are NULL for a group without timestamps
+        if first is not None:
+            firsts.append(first)
+        if last is not None:
+            lasts.append(last)
+    
+    return {
+        "total_messages": sum(by_sender.values()),
+        "by_sender": by_sender,
+        "by_type": by_type,
+        "first_message": min(firsts) if firsts else None,
+        "last_message": max(lasts) if lasts else None
+    }
+
 
 class MessageHistoryManager:
     """Manages message history with search capabilities."""
@@ -51,9 +112,14 @@ class MessageHistoryManager:
     ) -> List[Message]:
         """Search messages by content, sender, or type.
         
+        On SQLite, content search uses the full-text index: a message matches
+        when every whitespace-separated query term is the prefix of a word in
+        its content, so "mess" finds "message" but the mid-word fragment
+        "ssage" does not. Other databases fall back to a substring match.
+        
         Args:
             session_id: Session ID
-            query: Search query (searches in content)
+            query: Search query (word prefixes matched in content)
             sender: Optional sender filter
             message_type: Optional message type filter
             limit: Maximum results
@@ -63,8 +129,14 @@ class MessageHistoryManager:
         """
         conditions = [Message.session_id == session_id]
         
-        # Search in content
-        if query:
+        # Search in content: FTS5 index on SQLite, substring scan elsewhere
+        if query.strip() and self.db.get_bind().dialect.name == "sqlite":
+            conditions.append(Message.id.in_(
+                select(MESSAGE_FTS.c.rowid).where(
+                    literal_column("message_fts").op("MATCH")(_fts_query(query))
+                )
+            ))
+        elif query:
             conditions.append(Message.content.ilike(f"%{query}%"))
         
         # Filter by sender
@@ -160,83 +232,86 @@ class MessageHistoryManager:
         Returns:
             Dictionary with message statistics
         """
-        stmt = select(Message).where(Message.session_id == session_id)
-        messages = self.db.exec(stmt).all()
-        
-        if not messages:
-            return {
-                "total_messages": 0,
-                "by_sender": {},
-                "by_type": {},
-                "first_message": None,
-                "last_message": None
-            }
-        
-        # Count by sender
-        by_sender = {}
-        by_type = {}
-        
-        for msg in messages:
-            by_sender[msg.sender_name] = by_sender.get(msg.sender_name, 0) + 1
-            by_type[msg.message_type] = by_type.get(msg.message_type, 0) + 1
-        
-        messages_list = list(messages)
-        first = min(messages_list, key=lambda m: m.created_at)
-        last = max(messages_list, key=lambda m: m.created_at)
+        summary = summarize_messages(self.db, session_id)
+        first = summary["first_message"]
+        last = summary["last_message"]
         
         return {
-            "total_messages": len(messages_list),
-            "by_sender": by_sender,
-            "by_type": by_type,
-            "first_message": first.created_at.isoformat() if first.created_at else None,
-            "last_message": last.created_at.isoformat() if last.created_at else None
+            "total_messages": summary["total_messages"],
+            "by_sender": summary["by_sender"],
+            "by_type": summary["by_type"],
+            "first_message": first.isoformat() if first else None,
+            "last_message": last.isoformat() if last else None
         }
     
     def export_history(
         self,
         session_id: int,
-        format: str = "text"
-    ) -> str:
+        format: str = "text",
+        out: Optional[TextIO] = None
+    ) -> Optional[str]:
         """Export message history in various formats.
         
+        Messages are streamed row by row from the database, so memory use does
+        not grow with the size of the history.
+        
+        The JSON format is an array of objects with ``id``, ``sender``,
+        ``content``, ``type`` and ``timestamp`` keys, written one compact
+        object per line. Earlier versions pretty-printed each object with a
+        two-space indent; the parsed data is the same but the text layout
+        differs.
+        
         Args:
             session_id: Session ID
             format: Export format ('text', 'json', 'markdown')
+            out: Optional text stream to write to instead of returning a string
             
         Returns:
-            Formatted history string
+            Formatted history string, or None when written to ``out``
         """
-        messages = self.get_recent_messages(session_id, limit=1000)
+        if out is None:
+            buffer = io.StringIO()
+            self.export_history(session_id, format, buffer)
+            return buffer.getvalue()
+        
+        # Last 1000 messages as plain mappings, oldest first; the labels are
+        # the JSON export keys
+        recent = select(
+            Message.id,
+            Message.sender_name.label("sender"),
+            Message.content,
+            Message.message_type.label("type"),
+            Message.created_at.label("timestamp")
+        ).where(
+            Message.session_id == session_id
+        ).order_by(Message.created_at.desc()).limit(1000).subquery()
+        stmt = select(*recent.c).order_by(recent.c.timestamp).execution_options(yield_per=1000)
+        rows = self.db.exec(stmt).mappings()
         
         if format == "json":
-            import json
-            return json.dumps([
-                {
-                    "id": msg.id,
-                    "sender": msg.sender_name,
-                    "content": msg.content,
-                    "type": msg.message_type,
-                    "timestamp": msg.created_at.isoformat() if msg.created_at else None
-                }
-                for msg in messages
-            ], indent=2)
+            out.write("[")
+            separator = "\n  "
+            for row in rows:
+                out.write(separator)
+                # orjson renders datetimes natively as ISO 8601
+                out.write(orjson.dumps(dict(row)).decode())
+                separator = ",\n  "
+            out.write("]" if separator == "\n  " else "\n]")
         
         elif format == "markdown":
-            lines = ["# Message History\n"]
-            for msg in messages:
-                timestamp = msg.created_at.strftime("%Y-%m-%d %H:%M:%S") if msg.created_at else "Unknown"
-                lines.append(f"## {msg.sender_name} ({timestamp})")
-                lines.append(f"*Type: {msg.message_type}*\n")
-                lines.append(msg.content)
-                lines.append("\n---\n")
-            return "\n".join(lines)
+            out.write("# Message History\n")
+            for row in rows:
+                timestamp = row["timestamp"].strftime("%Y-%m-%d %H:%M:%S") if row["timestamp"] else "Unknown"
+                out.write(_MD_ROW % (row["sender"], timestamp, row["type"], row["content"]))
         
         else:  # text
-            lines = []
-            for msg in messages:
-                timestamp = msg.created_at.strftime("%Y-%m-%d %H:%M:%S") if msg.created_at else "Unknown"
-                lines.append(f"[{timestamp}] {msg.sender_name}: {msg.content}")
-            return "\n".join(lines)
+            separator = ""
+            for row in rows:
+                timestamp = row["timestamp"].strftime("%Y-%m-%d %H:%M:%S") if row["timestamp"] else "Unknown"
+                out.write(f"{separator}[{timestamp}] {row['sender']}: {row['content']}")
+                separator = "\n"
+        
+        return None
     
     def clear_old_messages(
         self,
@@ -252,17 +327,15 @@ class MessageHistoryManager:
         Returns:
             Number of messages deleted
         """
-        # Get all messages
-        stmt = select(Message).where(
+        # Single DELETE of everything outside the most recent messages
+        keep_ids = select(Message.id).where(
             Message.session_id == session_id
-        ).order_by(Message.created_at.desc())
-        messages = list(self.db.exec(stmt).all())
-        
-        # Keep only recent
-        to_delete = messages[keep_recent:]
-        
-        for msg in to_delete:
-            self.db.delete(msg)
+        ).order_by(Message.created_at.desc()).limit(keep_recent)
         
+        stmt = delete(Message).where(
+            Message.session_id == session_id,
+            Message.id.not_in(keep_ids)
+        )
+        result = self.db.execute(stmt)
         self.db.commit()
-        return len(to_delete)
+        return result.rowcount
@@ -1,6 +1,6 @@
 """Session state management with save/load functionality."""
 
-import json
+import orjson
 from pathlib import Path
 from typing import Dict, Optional, List
 from datetime import datetime, UTC
@@ -78,21 +78,18 @@ class SessionStateManager:
                     "max_hp": sp.character.max_hp
                 })
         
-        # Get recent messages (last 50)
-        stmt = select(Message).where(
+        # Get recent messages (last 50) as plain mappings; orjson renders the
+        # timestamps when the snapshot is written
+        recent = select(
+            Message.sender_name.label("sender"),
+            Message.content,
+            Message.message_type,
+            Message.created_at.label("timestamp")
+        ).where(
             Message.session_id == session_id
-        ).order_by(Message.created_at.desc()).limit(50)
-        messages = self.db.exec(stmt).all()
-        
-        recent_messages = [
-            {
-                "sender": msg.sender_name,
-                "content": msg.content,
-                "message_type": msg.message_type,
-                "timestamp": msg.created_at.isoformat() if msg.created_at else None
-            }
-            for msg in reversed(list(messages))
-        ]
+        ).order_by(Message.created_at.desc()).limit(50).subquery()
+        stmt = select(*recent.c).order_by(recent.c.timestamp)
+        recent_messages = [dict(row) for row in self.db.exec(stmt).mappings()]
         
         # Create snapshot
         snapshot = SessionSnapshot(
@@ -111,8 +108,8 @@ class SessionStateManager:
         filename = f"session_{session_id}_{timestamp}.json"
         filepath = self.save_dir / filename
         
-        with open(filepath, 'w') as f:
-            json.dump(asdict(snapshot), f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(asdict(snapshot), option=orjson.OPT_INDENT_2))
         
         return filepath
     
@@ -125,8 +122,8 @@ class SessionStateManager:
         Returns:
             SessionSnapshot object
         """
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        with open(filepath, 'rb') as f:
+            data = orjson.loads(f.read())
         
         return SessionSnapshot(**data)
     
@@ -152,8 +149,8 @@ class SessionStateManager:
         Returns:
             Dictionary with save file info
         """
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        with open(filepath, 'rb') as f:
+            data = orjson.loads(f.read())
         
         return {
             "filename": filepath.name,
@@ -190,7 +187,7 @@ class SessionStateManager:
             Path to auto-save file or None if failed
         """
         try:
-            # Keep only last 5 auto-saves
+            # Keep only last 5 auto-saves, counting the one about to be written
             auto_saves = [
                 p for p in self.list_saves(session_id)
                 if "_auto_" in p.name
@@ -198,7 +195,7 @@ class SessionStateManager:
             
             if len(auto_saves) >= 5:
                 # Delete oldest
-                for old_save in auto_saves[5:]:
+                for old_save in auto_saves[4:]:
                     self.delete_save(old_save)
             
             # Create auto-save with special naming
@@ -206,6 +203,6 @@ class SessionStateManager:
             filename = f"session_{session_id}_auto_{timestamp}.json"
             filepath = self.save_dir / filename
             
-            return self.save_session(session_id, {"auto_save": True})
+            return self.save_session(session_id, {"auto_save": True}).replace(filepath)
         except Exception:
             return None
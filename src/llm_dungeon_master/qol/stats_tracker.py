@@ -2,10 +2,11 @@
 
 from typing import Dict, List, Optional
 from datetime import datetime, UTC, timedelta
-from sqlmodel import Session as DBSession, select, func
+from sqlmodel import Session as DBSession, select, func, case, and_
 from collections import defaultdict
 
 from ..models import Roll, CombatEncounter, Message, Character
+from .history_manager import summarize_messages
 
 
 class StatisticsTracker:
@@ -39,14 +40,21 @@ class StatisticsTracker:
         if character_id:
             conditions.append(Roll.character_id == character_id)
         
-        if conditions:
-            stmt = select(Roll).where(*conditions)
-        else:
-            stmt = select(Roll)
-        
-        rolls = list(self.db.exec(stmt).all())
-        
-        if not rolls:
+        # Aggregate per (type, formula) in SQL; only the formula is parsed here
+        stmt = select(
+            Roll.roll_type,
+            Roll.formula,
+            func.count(),
+            func.sum(Roll.result),
+            func.max(Roll.result),
+            func.min(Roll.result),
+            func.sum(case((Roll.result >= 20, 1), else_=0)),
+            func.sum(case((Roll.result <= 1, 1), else_=0))
+        ).where(*conditions).group_by(Roll.roll_type, Roll.formula)
+        
+        groups = list(self.db.exec(stmt).all())
+        
+        if not groups:
             return {
                 "total_rolls": 0,
                 "by_type": {},
@@ -63,35 +71,33 @@ class StatisticsTracker:
         by_die = defaultdict(int)
         critical_hits = 0
         critical_failures = 0
+        total_rolls = 0
+        total_result = 0
         
-        results = []
-        
-        for roll in rolls:
-            by_type[roll.roll_type] += 1
+        for roll_type, formula, count, result_sum, highest, lowest, highs, lows in groups:
+            by_type[roll_type] += count
+            total_rolls += count
+            total_result += result_sum
             
             # Parse dice formula to get die type
-            if 'd' in roll.formula.lower():
-                die_type = roll.formula.lower().split('d')[1].split('+')[0].split('-')[0].strip()
-                by_die[f"d{die_type}"] += 1
+            if 'd' in formula.lower():
+                die_type = formula.lower().split('d')[1].split('+')[0].split('-')[0].strip()
+                by_die[f"d{die_type}"] += count
             
             # Check for crits (d20 rolls)
-            if 'd20' in roll.formula.lower():
-                if roll.result >= 20:
-                    critical_hits += 1
-                elif roll.result <= 1:
-                    critical_failures += 1
-            
-            results.append(roll.result)
+            if 'd20' in formula.lower():
+                critical_hits += highs
+                critical_failures += lows
         
         return {
-            "total_rolls": len(rolls),
+            "total_rolls": total_rolls,
             "by_type": dict(by_type),
             "by_die": dict(by_die),
             "critical_hits": critical_hits,
             "critical_failures": critical_failures,
-            "average_result": sum(results) / len(results) if results else 0,
-            "highest_roll": max(results) if results else 0,
-            "lowest_roll": min(results) if results else 0
+            "average_result": total_result / total_rolls,
+            "highest_roll": max(group[4] for group in groups),
+            "lowest_roll": min(group[5] for group in groups)
         }
     
     def get_combat_stats(self, session_id: Optional[int] = None) -> Dict:
@@ -103,16 +109,23 @@ class StatisticsTracker:
         Returns:
             Dictionary with combat statistics
         """
+        # Rounds only count for completed encounters that got going
+        counted_rounds = case(
+            (and_(CombatEncounter.is_active.is_(False), CombatEncounter.round_number > 0),
+             CombatEncounter.round_number)
+        )
+        stmt = select(
+            func.count(),
+            func.sum(case((CombatEncounter.is_active, 1), else_=0)),
+            func.count(counted_rounds),
+            func.sum(counted_rounds)
+        )
         if session_id:
-            stmt = select(CombatEncounter).where(
-                CombatEncounter.session_id == session_id
-            )
-        else:
-            stmt = select(CombatEncounter)
+            stmt = stmt.where(CombatEncounter.session_id == session_id)
         
-        encounters = list(self.db.exec(stmt).all())
+        total, active, rounded, total_rounds = self.db.exec(stmt).one()
         
-        if not encounters:
+        if not total:
             return {
                 "total_encounters": 0,
                 "active_encounters": 0,
@@ -121,17 +134,12 @@ class StatisticsTracker:
                 "total_rounds": 0
             }
         
-        active = sum(1 for e in encounters if e.is_active)
-        completed = len(encounters) - active
-        
-        rounds = [e.round_number for e in encounters if not e.is_active and e.round_number > 0]
-        
         return {
-            "total_encounters": len(encounters),
+            "total_encounters": total,
             "active_encounters": active,
-            "completed_encounters": completed,
-            "average_rounds": sum(rounds) / len(rounds) if rounds else 0,
-            "total_rounds": sum(rounds) if rounds else 0
+            "completed_encounters": total - active,
+            "average_rounds": total_rounds / rounded if rounded else 0,
+            "total_rounds": total_rounds or 0
         }
     
     def get_character_stats(self, character_id: int) -> Dict:
@@ -178,33 +186,21 @@ class StatisticsTracker:
         dice_stats = self.get_dice_stats(session_id=session_id)
         combat_stats = self.get_combat_stats(session_id=session_id)
         
-        # Get message stats
-        stmt = select(Message).where(Message.session_id == session_id)
-        messages = list(self.db.exec(stmt).all())
-        
-        by_sender = defaultdict(int)
-        by_type = defaultdict(int)
-        
-        for msg in messages:
-            by_sender[msg.sender_name] += 1
-            by_type[msg.message_type] += 1
+        summary = summarize_messages(self.db, session_id)
         
         # Calculate duration
-        if messages:
-            timestamps = [m.created_at for m in messages if m.created_at]
-            if timestamps:
-                duration = max(timestamps) - min(timestamps)
-                duration_minutes = duration.total_seconds() / 60
-            else:
-                duration_minutes = 0
+        first = summary["first_message"]
+        last = summary["last_message"]
+        if first and last:
+            duration_minutes = (last - first).total_seconds() / 60
         else:
             duration_minutes = 0
         
         return {
             "session_id": session_id,
-            "total_messages": len(messages),
-            "messages_by_sender": dict(by_sender),
-            "messages_by_type": dict(by_type),
+            "total_messages": summary["total_messages"],
+            "messages_by_sender": summary["by_sender"],
+            "messages_by_type": summary["by_type"],
             "duration_minutes": duration_minutes,
             "dice_stats": dice_stats,
             "combat_stats": combat_stats
@@ -226,89 +222,70 @@ class StatisticsTracker:
         """
         cutoff = datetime.now(UTC) - timedelta(days=days)
         
-        stmt = select(Message).where(
+        # Bucket by day in SQL instead of building a datetime per message
+        day = func.date(Message.created_at)
+        stmt = select(day, Message.sender_name, func.count()).where(
             Message.session_id == session_id,
+            Message.created_at.is_not(None),
             Message.created_at >= cutoff
-        ).order_by(Message.created_at)
-        
-        messages = list(self.db.exec(stmt).all())
+        ).group_by(day, Message.sender_name).order_by(day)
         
-        # Group by day and sender
-        activity_by_day = defaultdict(lambda: defaultdict(int))
+        activity_by_day = defaultdict(dict)
+        total_messages = 0
         
-        for msg in messages:
-            if msg.created_at:
-                day = msg.created_at.date().isoformat()
-                activity_by_day[day][msg.sender_name] += 1
+        for msg_day, sender, count in self.db.exec(stmt):
+            total_messages += count
+            # date() is NULL for timestamps SQLite cannot parse
+            if msg_day is not None:
+                activity_by_day[str(msg_day)][sender] = count
         
         return {
             "period_days": days,
             "cutoff_date": cutoff.isoformat(),
-            "activity_by_day": {
-                day: dict(senders)
-                for day, senders in activity_by_day.items()
-            },
-            "total_messages": len(messages)
+            "activity_by_day": dict(activity_by_day),
+            "total_messages": total_messages
         }
     
-    def get_leaderboard(self, session_id: int, metric: str = "messages") -> List[Dict]:
+    def get_leaderboard(
+        self,
+        session_id: int,
+        metric: str = "messages",
+        limit: Optional[int] = None
+    ) -> List[Dict]:
         """Get a leaderboard for a specific metric.
         
+        Ranking happens in SQL, so only the requested rows are fetched. Ties
+        share a rank and are listed by player name.
+        
         Args:
             session_id: Session ID
             metric: Metric to rank by ('messages', 'rolls', 'crits')
+            limit: Optional maximum number of rankings
             
         Returns:
-            List of rankings
+            List of rankings with "player", "count" and "rank" keys
         """
         if metric == "messages":
-            stmt = select(Message).where(Message.session_id == session_id)
-            items = list(self.db.exec(stmt).all())
-            
-            counts = defaultdict(int)
-            for msg in items:
-                counts[msg.sender_name] += 1
-            
-            rankings = [
-                {"player": sender, "count": count}
-                for sender, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)
-            ]
-            
-        elif metric == "rolls":
-            stmt = select(Roll).where(Roll.session_id == session_id)
-            rolls = list(self.db.exec(stmt).all())
-            
-            counts = defaultdict(int)
-            for roll in rolls:
-                if roll.character:
-                    counts[roll.character.name] += 1
-            
-            rankings = [
-                {"player": name, "count": count}
-                for name, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)
-            ]
-            
-        elif metric == "crits":
-            stmt = select(Roll).where(
-                Roll.session_id == session_id,
-                Roll.formula.ilike('%d20%')
+            name = Message.sender_name
+            stmt = select(name.label("player"), func.count().label("count")).where(
+                Message.session_id == session_id
             )
-            rolls = list(self.db.exec(stmt).all())
-            
-            counts = defaultdict(int)
-            for roll in rolls:
-                if roll.result >= 20 and roll.character:
-                    counts[roll.character.name] += 1
-            
-            rankings = [
-                {"player": name, "count": count}
-                for name, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)
-            ]
-        
+        elif metric in ("rolls", "crits"):
+            name = Character.name
+            stmt = select(name.label("player"), func.count().label("count")).select_from(
+                Roll
+            ).join(Character, Roll.character_id == Character.id).where(Roll.session_id == session_id)
+            if metric == "crits":
+                stmt = stmt.where(Roll.formula.ilike('%d20%'), Roll.result >= 20)
         else:
-            rankings = []
+            return []
+        
+        count = func.count()
+        stmt = stmt.add_columns(
+            func.rank().over(order_by=count.desc()).label("rank")
+        ).group_by(name).order_by(count.desc(), name).limit(limit)
         
-        return rankings
+        return [dict(row) for row in self.db.exec(stmt).mappings()]
     
     def format_stats_report(self, stats: Dict) -> str:
         """Format statistics as a readable report.
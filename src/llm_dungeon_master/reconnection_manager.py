@@ -4,6 +4,8 @@ from datetime import datetime, UTC, timedelta
 from typing import Optional, Dict
 import secrets
 import hashlib
+from sqlalchemy import update
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session as DBSession, select
 
 from .models import ReconnectionToken, Player, Session as GameSession, SessionPlayer, PlayerPresence
@@ -100,6 +102,26 @@ class ReconnectionManager:
         
         return token_record
     
+    def expire_token(self, token: str) -> bool:
+        """
+        Expire a reconnection token immediately.
+        
+        Args:
+            token: The token string
+            
+        Returns:
+            True if a token was expired
+        """
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        
+        # Single UPDATE; no need to load the token row first
+        statement = update(ReconnectionToken).where(
+            ReconnectionToken.token == token_hash
+        ).values(expires_at=datetime.now(UTC) - timedelta(hours=1))
+        result = self.db.execute(statement)
+        self.db.commit()
+        return result.rowcount > 0
+    
     def handle_reconnection(self, token: str) -> Dict[str, any]:
         """
         Handle a player reconnection using a token.
@@ -169,7 +191,7 @@ class ReconnectionManager:
         statement = select(SessionPlayer).where(
             SessionPlayer.session_id == session_id,
             SessionPlayer.player_id == player_id
-        )
+        ).options(selectinload(SessionPlayer.character))
         session_player = self.db.exec(statement).first()
         
         if not session_player:
@@ -178,8 +200,7 @@ class ReconnectionManager:
         # Get character info if assigned
         character_info = None
         if session_player.character_id:
-            from .models import Character
-            character = self.db.get(Character, session_player.character_id)
+            character = session_player.character
             if character:
                 character_info = {
                     "id": character.id,
@@ -215,22 +236,22 @@ class ReconnectionManager:
         ).order_by(Message.created_at.desc()).limit(50)
         messages = list(self.db.exec(message_statement).all())
         
-        # Get other players' presence
-        presence_statement = select(PlayerPresence).where(
-            PlayerPresence.session_id == session_id
+        # Get other players' presence, joined to their player rows
+        presence_statement = select(PlayerPresence, Player).join(
+            Player, Player.id == PlayerPresence.player_id
+        ).where(
+            PlayerPresence.session_id == session_id,
+            PlayerPresence.player_id != player_id
         )
-        presences = list(self.db.exec(presence_statement).all())
-        
-        other_players = []
-        for presence in presences:
-            if presence.player_id != player_id:
-                player = self.db.get(Player, presence.player_id)
-                if player:
-                    other_players.append({
-                        "player_id": player.id,
-                        "player_name": player.name,
-                        "status": presence.status
-                    })
+        
+        other_players = [
+            {
+                "player_id": player.id,
+                "player_name": player.name,
+                "status": presence.status
+            }
+            for presence, player in self.db.exec(presence_statement).all()
+        ]
         
         return {
             "session_id": session_id,
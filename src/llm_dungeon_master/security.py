@@ -3,11 +3,17 @@
 Provides rate limiting, input validation, and security headers.
 """
 
+import heapq
+import os
+import re
+import secrets
 import time
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Callable, Dict, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Callable, Optional
 
+import orjson
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -15,23 +21,75 @@ from starlette.status import HTTP_429_TOO_MANY_REQUESTS
 
 from .config import settings
 
+NS_PER_SECOND = 1_000_000_000
+
+# Rate limiter tokens are stored in billionths, matching nanosecond clock ticks
+TOKEN_SCALE = NS_PER_SECOND
+
+# Dice formula with spaces removed: XdY with an optional +Z or -Z modifier
+DICE_FORMULA_PATTERN = re.compile(r"\d+d\d+(?:[+-]\d+)?")
+
+# Health check endpoints are never rate limited
+RATE_LIMIT_EXEMPT_PATHS = frozenset({"/health", "/ready", "/live"})
+
+# Headers added to every response by SecurityHeadersMiddleware
+SECURITY_HEADERS = (
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("X-XSS-Protection", "1; mode=block"),
+    ("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+)
+ENCODED_SECURITY_HEADERS = tuple(
+    (name.lower().encode("latin-1"), value.encode("latin-1"))
+    for name, value in SECURITY_HEADERS
+)
+REPLACED_HEADER_NAMES = frozenset(
+    [name for name, _ in ENCODED_SECURITY_HEADERS] + [b"server"]
+)
+
 
 class RateLimiter:
-    """Token bucket rate limiter for API endpoints."""
+    """Token bucket rate limiter for API endpoints.
+    
+    Each bucket is ``[tokens, last_update]`` with tokens counted in
+    billionths and time in monotonic nanoseconds, so refills are exact
+    integer arithmetic. Keys are striped across shards, each with its own
+    lock and buckets kept in least-recently-used order, so concurrent
+    requests from different clients rarely wait on each other.
+    """
+    
+    __slots__ = ("rate", "burst", "_shards", "_shard_mask", "_clock")
     
-    def __init__(self, rate: int = 60, burst: int = 10):
+    def __init__(
+        self,
+        rate: int = 60,
+        burst: int = 10,
+        shards: Optional[int] = None,
+        *,
+        clock: Callable[[], int] = time.monotonic_ns
+    ):
         """Initialize rate limiter.
         
         Args:
             rate: Maximum requests per minute
             burst: Maximum burst size
+            shards: Number of bucket shards, rounded up to a power of two
+                (default: CPU count)
+            clock: Monotonic clock returning nanoseconds
         """
         self.rate = rate
         self.burst = burst
-        self.buckets: Dict[str, Dict] = defaultdict(lambda: {
-            "tokens": burst,
-            "last_update": time.time()
-        })
+        count = 1 << (max(1, shards or os.cpu_count() or 1) - 1).bit_length()
+        self._shards: list[tuple[Lock, OrderedDict[str, list[int]]]] = [
+            (Lock(), OrderedDict()) for _ in range(count)
+        ]
+        self._shard_mask = count - 1
+        self._clock = clock
+    
+    @property
+    def shard_count(self) -> int:
+        """Number of bucket shards."""
+        return len(self._shards)
     
     def is_allowed(self, key: str) -> tuple[bool, Optional[int]]:
         """Check if request is allowed under rate limit.
@@ -42,36 +100,141 @@ class RateLimiter:
         Returns:
             Tuple of (allowed, retry_after_seconds)
         """
-        bucket = self.buckets[key]
-        now = time.time()
-        
-        # Refill tokens based on time elapsed
-        elapsed = now - bucket["last_update"]
-        bucket["tokens"] = min(
-            self.burst,
-            bucket["tokens"] + elapsed * (self.rate / 60)
-        )
-        bucket["last_update"] = now
+        return self._acquire(key, TOKEN_SCALE)
+    
+    def try_acquire(self, key: str, n: int = 1) -> tuple[bool, Optional[int]]:
+        """Atomically take ``n`` tokens from a bucket.
+        
+        Args:
+            key: Identifier for rate limiting (e.g., IP address, user ID)
+            n: Number of tokens, for actions more expensive than one request
+            
+        Returns:
+            Tuple of (allowed, retry_after_seconds)
+            
+        Raises:
+            ValueError: If ``n`` is less than 1 or larger than the burst size
+        """
+        if n < 1:
+            raise ValueError(f"Token count must be at least 1, got {n}")
+        if n > self.burst:
+            raise ValueError(f"Token count {n} exceeds burst size {self.burst}")
+        
+        return self._acquire(key, n * TOKEN_SCALE)
+    
+    def _acquire(self, key: str, cost: int) -> tuple[bool, Optional[int]]:
+        """Take ``cost`` scaled tokens from a bucket under its shard lock."""
+        lock, buckets = self._shards[hash(key) & self._shard_mask]
+        
+        with lock:
+            now = self._clock()
+            bucket = buckets.get(key)
+            
+            if bucket is None:
+                bucket = buckets[key] = [self.burst * TOKEN_SCALE, now]
+            else:
+                buckets.move_to_end(key)
+                # Refill tokens based on time elapsed
+                bucket[0] = min(
+                    self.burst * TOKEN_SCALE,
+                    bucket[0] + (now - bucket[1]) * self.rate // 60
+                )
+                bucket[1] = now
+            
+            # Check if request is allowed
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, None
+            tokens = bucket[0]
+        
+        # Calculate retry-after time (ensure at least 1 second)
+        retry_after = max(1, (cost - tokens) * 60 // (self.rate * TOKEN_SCALE))
+        return False, retry_after
+    
+    def remaining(self, key: str) -> int:
+        """Get the whole tokens left in a bucket as of its last request.
+        
+        Args:
+            key: Identifier for rate limiting
+            
+        Returns:
+            Number of remaining tokens
+        """
+        bucket = self._shards[hash(key) & self._shard_mask][1].get(key)
+        return self.burst if bucket is None else bucket[0] // TOKEN_SCALE
+    
+    def cleanup_idle_buckets(self, max_idle: Optional[float] = None) -> int:
+        """Remove buckets that have not been used recently.
         
-        # Check if request is allowed
-        if bucket["tokens"] >= 1:
-            bucket["tokens"] -= 1
-            return True, None
-        else:
-            # Calculate retry-after time (ensure at least 1 second)
-            retry_after = max(1, int((1 - bucket["tokens"]) / (self.rate / 60)))
-            return False, retry_after
+        Args:
+            max_idle: Idle seconds after which a bucket is dropped (default:
+                the time to refill a bucket completely, after which it is
+                indistinguishable from a new one)
+            
+        Returns:
+            Number of buckets removed
+        """
+        if max_idle is None:
+            max_idle = self.burst * 60 / self.rate if self.rate else float("inf")
+        cutoff = self._clock() - int(max_idle * NS_PER_SECOND)
+        
+        removed = 0
+        for lock, buckets in self._shards:
+            with lock:
+                # Least recently used first, so stop at the first recent bucket
+                while buckets:
+                    key, (_, last_update) = next(iter(buckets.items()))
+                    if last_update > cutoff:
+                        break
+                    del buckets[key]
+                    removed += 1
+        
+        return removed
+
+
+@lru_cache(maxsize=128)
+def rate_limit_body(retry_after: int) -> bytes:
+    """Encode the 429 response body; rejections mostly share a few values.
+    
+    Args:
+        retry_after: Seconds until the client may retry
+        
+    Returns:
+        JSON body bytes
+    """
+    return orjson.dumps({"error": "Rate limit exceeded", "retry_after": retry_after})
+
+
+class RateLimitedResponse(JSONResponse):
+    """JSON response whose content is already encoded bytes."""
+    
+    def render(self, content: bytes) -> bytes:
+        return content
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Middleware for rate limiting API requests."""
     
-    def __init__(self, app, rate_limiter: Optional[RateLimiter] = None):
+    def __init__(
+        self,
+        app,
+        rate_limiter: Optional[RateLimiter] = None,
+        cleanup_interval: int = 1000
+    ):
+        """Initialize rate limit middleware.
+        
+        Args:
+            app: ASGI application
+            rate_limiter: Rate limiter to use (default: built from settings)
+            cleanup_interval: Rate-limited requests between idle bucket sweeps
+        """
         super().__init__(app)
         self.rate_limiter = rate_limiter or RateLimiter(
             rate=settings.rate_limit_per_minute,
             burst=settings.rate_limit_burst
         )
+        self.cleanup_interval = cleanup_interval
+        self._requests_since_cleanup = 0
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Process request with rate limiting."""
@@ -80,7 +243,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
         
         # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/ready", "/live"]:
+        if request.url.path in RATE_LIMIT_EXEMPT_PATHS:
             return await call_next(request)
         
         # Get client identifier (IP address)
@@ -89,13 +252,17 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Check rate limit
         allowed, retry_after = self.rate_limiter.is_allowed(client_ip)
         
+        # Periodically drop buckets of clients that have gone quiet, so
+        # memory stays proportional to recently active clients
+        self._requests_since_cleanup += 1
+        if self._requests_since_cleanup >= self.cleanup_interval:
+            self._requests_since_cleanup = 0
+            self.rate_limiter.cleanup_idle_buckets()
+        
         if not allowed:
-            return JSONResponse(
+            return RateLimitedResponse(
+                rate_limit_body(retry_after),
                 status_code=HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "error": "Rate limit exceeded",
-                    "retry_after": retry_after
-                },
                 headers={"Retry-After": str(retry_after)}
             )
         
@@ -104,7 +271,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         # Add rate limit headers
         response.headers["X-RateLimit-Limit"] = str(self.rate_limiter.rate)
-        response.headers["X-RateLimit-Remaining"] = str(int(self.rate_limiter.buckets[client_ip]["tokens"]))
+        response.headers["X-RateLimit-Remaining"] = str(self.rate_limiter.remaining(client_ip))
         
         return response
 
@@ -116,15 +283,14 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         """Add security headers to response."""
         response = await call_next(request)
         
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        # Remove server identification
-        if "server" in response.headers:
-            del response.headers["server"]
+        # Drop existing copies of our headers and the server identification
+        # in one pass over the raw header list, then append the encoded set
+        response.raw_headers = [
+            header for header in response.raw_headers
+            if header[0] not in REPLACED_HEADER_NAMES
+        ] + list(ENCODED_SECURITY_HEADERS)
+        # A cached headers view still wraps the old list; let it be rebuilt
+        vars(response).pop("_headers", None)
         
         return response
 
@@ -192,11 +358,10 @@ def validate_dice_formula(formula: str) -> str:
     Raises:
         HTTPException: If formula is invalid
     """
-    import re
+    compact = formula.replace(" ", "")
     
-    # Basic dice formula validation
-    pattern = r"^\d+d\d+([+-]\d+)?$"
-    if not re.match(pattern, formula.replace(" ", "")):
+    # Every valid formula starts with the dice count; skip the regex otherwise
+    if not compact[:1].isdigit() or not DICE_FORMULA_PATTERN.fullmatch(compact):
         raise HTTPException(
             status_code=400,
             detail=f"Invalid dice formula: {formula}. Expected format: XdY or XdY+Z"
@@ -231,10 +396,23 @@ def sanitize_string(text: str, max_length: int = 1000) -> str:
 
 
 class SessionTokenManager:
-    """Manage session tokens for reconnection."""
+    """Manage session tokens for reconnection.
+    
+    At most ``max_tokens`` tokens are kept; creating more evicts the oldest,
+    so a client flooding ``create_token`` cannot grow memory without bound.
+    Expiry times are monotonic-clock nanoseconds, also kept in a heap so
+    cleanup only touches tokens that have actually expired.
+    """
     
-    def __init__(self):
-        self.tokens: Dict[str, tuple[int, int, datetime]] = {}  # token -> (session_id, player_id, expiry)
+    def __init__(self, max_tokens: int = 10000):
+        """Initialize token manager.
+        
+        Args:
+            max_tokens: Maximum number of live tokens
+        """
+        self.max_tokens = max_tokens
+        self.tokens: OrderedDict[str, tuple[int, int, int]] = OrderedDict()  # token -> (session_id, player_id, expiry_ns)
+        self._expiry_heap: list[tuple[int, str]] = []
     
     def create_token(self, session_id: int, player_id: int) -> str:
         """Create a reconnection token.
@@ -246,11 +424,21 @@ class SessionTokenManager:
         Returns:
             Reconnection token
         """
-        import secrets
-        
         token = secrets.token_urlsafe(32)
-        expiry = datetime.now() + timedelta(seconds=settings.session_timeout)
+        expiry = time.monotonic_ns() + int(settings.session_timeout * NS_PER_SECOND)
         self.tokens[token] = (session_id, player_id, expiry)
+        heapq.heappush(self._expiry_heap, (expiry, token))
+        
+        # Evict the oldest tokens once over capacity
+        while len(self.tokens) > self.max_tokens:
+            self.tokens.popitem(last=False)
+        
+        # Drop heap entries for evicted or revoked tokens before they pile up
+        if len(self._expiry_heap) > 2 * self.max_tokens:
+            self._expiry_heap = [
+                (expiry, token) for token, (_, _, expiry) in self.tokens.items()
+            ]
+            heapq.heapify(self._expiry_heap)
         
         return token
     
@@ -263,13 +451,14 @@ class SessionTokenManager:
         Returns:
             Tuple of (session_id, player_id) if valid, None otherwise
         """
-        if token not in self.tokens:
+        entry = self.tokens.get(token)
+        if entry is None:
             return None
         
-        session_id, player_id, expiry = self.tokens[token]
+        session_id, player_id, expiry = entry
         
         # Check if token is expired
-        if datetime.now() > expiry:
+        if time.monotonic_ns() > expiry:
             del self.tokens[token]
             return None
         
@@ -281,8 +470,7 @@ class SessionTokenManager:
         Args:
             token: Token to revoke
         """
-        if token in self.tokens:
-            del self.tokens[token]
+        self.tokens.pop(token, None)
     
     def cleanup_expired_tokens(self) -> int:
         """Remove expired tokens.
@@ -290,16 +478,19 @@ class SessionTokenManager:
         Returns:
             Number of tokens removed
         """
-        now = datetime.now()
-        expired = [
-            token for token, (_, _, expiry) in self.tokens.items()
-            if now > expiry
-        ]
-        
-        for token in expired:
-            del self.tokens[token]
-        
-        return len(expired)
+        now = time.monotonic_ns()
+        heap = self._expiry_heap
+        removed = 0
+        
+        # Soonest expiry first, so stop at the first live token
+        while heap and heap[0][0] < now:
+            expiry, token = heapq.heappop(heap)
+            entry = self.tokens.get(token)
+            if entry is not None and entry[2] == expiry:
+                del self.tokens[token]
+                removed += 1
+        
+        return removed
 
 
 # Global instances
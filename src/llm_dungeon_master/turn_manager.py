@@ -2,6 +2,7 @@
 
 from datetime import datetime, UTC
 from typing import Optional, List, Dict
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session as DBSession, select
 from enum import Enum
 
@@ -260,20 +261,22 @@ class TurnManager:
         session_id: int,
         limit: int = 50
     ) -> List[Dict[str, any]]:
-        """Get recent turn history with actions."""
+        """Get recent turn history with actions.
+        
+        Actions for all returned turns are loaded with one selectin query
+        rather than one query per turn.
+        """
         statement = select(Turn).where(
             Turn.session_id == session_id
-        ).order_by(Turn.round_number.desc(), Turn.turn_order.desc()).limit(limit)
+        ).order_by(
+            Turn.round_number.desc(), Turn.turn_order.desc()
+        ).limit(limit).options(selectinload(Turn.actions))
         
         turns = list(self.db.exec(statement).all())
         
         history = []
         for turn in turns:
-            # Get actions for this turn
-            action_stmt = select(TurnAction).where(
-                TurnAction.turn_id == turn.id
-            ).order_by(TurnAction.timestamp)
-            actions = list(self.db.exec(action_stmt).all())
+            actions = sorted(turn.actions, key=lambda action: action.timestamp)
             
             history.append({
                 "character_name": turn.character_name,
@@ -281,6 +284,7 @@ class TurnManager:
                 "status": turn.status,
                 "started_at": turn.started_at,
                 "ended_at": turn.ended_at,
+                "has_actions": bool(actions),
                 "actions": [
                     {
                         "type": action.action_type,
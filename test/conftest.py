@@ -1,27 +1,103 @@
 """Test configuration and fixtures."""
 
+from contextlib import contextmanager
+from types import SimpleNamespace
+
 import pytest
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.pool import StaticPool
 from fastapi.testclient import TestClient
 
 from llm_dungeon_master.server import app
 from llm_dungeon_master.models import Player, Session as GameSession, Character, Message
 
 
-@pytest.fixture(name="engine")
+@pytest.fixture(name="engine", scope="session")
 def engine_fixture():
-    """Create a test database engine."""
-    engine = create_engine("sqlite:///:memory:", echo=False)
+    """Create a test database engine shared by the whole test run.
+    
+    The schema is created once; tests are isolated by the transaction
+    rollback in the session fixture instead of by rebuilding the database.
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    
+    # pysqlite emits its own BEGIN/COMMIT and breaks SAVEPOINT handling;
+    # let SQLAlchemy control transactions instead.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _emit_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+    
+    # Test-only durability settings: never wait on syncs or disk journals
+    @event.listens_for(engine, "connect")
+    def _set_test_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    
     SQLModel.metadata.create_all(engine)
     yield engine
     SQLModel.metadata.drop_all(engine)
+    engine.dispose()
 
 
 @pytest.fixture(name="session")
 def session_fixture(engine):
-    """Create a test database session."""
-    with Session(engine) as session:
-        yield session
+    """Create a test database session rolled back at the end of the test.
+    
+    The session joins an outer transaction through a SAVEPOINT, so calls to
+    ``session.commit()`` in tests or code under test only release the
+    savepoint and everything is discarded on teardown.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    
+    yield session
+    
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(name="query_counter")
+def query_counter_fixture(engine):
+    """Count the SQL statements the engine executes inside a ``with`` block.
+    
+    Savepoint bookkeeping from the session fixture is not counted.
+    
+    Usage::
+    
+        with query_counter() as qc:
+            manager.do_something()
+        assert qc.count <= 3
+    """
+    @contextmanager
+    def counter():
+        counts = SimpleNamespace(count=0)
+        
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            if not statement.startswith(("SAVEPOINT", "RELEASE SAVEPOINT")):
+                counts.count += 1
+        
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            yield counts
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+    
+    return counter
 
 
 @pytest.fixture(name="client")
@@ -36,8 +112,7 @@ def sample_player_fixture(session):
     """Create a sample player for testing."""
     player = Player(name="Test Player")
     session.add(player)
-    session.commit()
-    session.refresh(player)
+    session.flush()  # Assigns the primary key without a commit/refresh round-trip
     return player
 
 
@@ -46,8 +121,7 @@ def sample_session_fixture(session):
     """Create a sample game session for testing."""
     game_session = GameSession(name="Test Session", dm_name="Test DM")
     session.add(game_session)
-    session.commit()
-    session.refresh(game_session)
+    session.flush()  # Assigns the primary key without a commit/refresh round-trip
     return game_session
 
 
@@ -3,23 +3,29 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, create_engine, Session as DBSession
-from sqlmodel.pool import StaticPool
 
 from llm_dungeon_master.server import app, get_db
 
 
+# Named shared-cache in-memory database: every connection opened by the
+# engine (one per thread) sees the same data, so no single-connection pool
+# is needed to reach it from the TestClient's worker thread.
+TEST_DATABASE_URL = "sqlite:///file:health_test_db?mode=memory&cache=shared&uri=true"
+
+
 # Create test database
 @pytest.fixture(name="session")
 def session_fixture():
     """Create test database session."""
     engine = create_engine(
-        "sqlite:///:memory:",
+        TEST_DATABASE_URL,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
     )
     SQLModel.metadata.create_all(engine)
     with DBSession(engine) as session:
         yield session
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
 
 
 @pytest.fixture(name="client")
@@ -116,22 +122,15 @@ class TestRootEndpoint:
 class TestHealthIntegration:
     """Integration tests for health check system."""
     
-    def test_all_health_endpoints_accessible(self, client):
-        """Test all health check endpoints are accessible."""
-        endpoints = ["/health", "/ready", "/live"]
+    @pytest.mark.parametrize("endpoint", ["/health", "/ready", "/live"])
+    def test_health_endpoint_contract(self, client, endpoint):
+        """Test each health endpoint is accessible and reports status and timestamp."""
+        response = client.get(endpoint)
+        assert response.status_code == 200, f"Endpoint {endpoint} failed"
         
-        for endpoint in endpoints:
-            response = client.get(endpoint)
-            assert response.status_code == 200, f"Endpoint {endpoint} failed"
-    
-    def test_health_endpoints_return_timestamps(self, client):
-        """Test all health endpoints include timestamps."""
-        endpoints = ["/health", "/ready", "/live"]
-        
-        for endpoint in endpoints:
-            response = client.get(endpoint)
-            data = response.json()
-            assert "timestamp" in data, f"Endpoint {endpoint} missing timestamp"
+        data = response.json()
+        assert "status" in data, f"Endpoint {endpoint} missing status"
+        assert "timestamp" in data, f"Endpoint {endpoint} missing timestamp"
     
     def test_health_check_versioning(self, client):
         """Test health check includes version information."""
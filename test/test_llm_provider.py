@@ -1,7 +1,12 @@
 """Tests for LLM providers."""
 
 import pytest
-from llm_dungeon_master.llm_provider import MockProvider, OpenAIProvider, get_llm_provider
+from llm_dungeon_master.llm_provider import (
+    MockProvider,
+    OpenAIProvider,
+    _build_llm_provider,
+    get_llm_provider
+)
 from llm_dungeon_master.config import settings
 
 
@@ -88,66 +93,60 @@ async def test_mock_provider_stream():
     assert len(full_response) > 0
 
 
-def test_get_llm_provider_mock():
+@pytest.fixture(scope="module", autouse=True)
+def clear_provider_cache():
+    """Drop providers cached while settings were patched by this module."""
+    yield
+    _build_llm_provider.cache_clear()
+
+
+def test_get_llm_provider_mock(monkeypatch):
     """Test getting mock provider."""
-    # Save original setting
-    original_provider = settings.llm_provider
+    monkeypatch.setattr(settings, "llm_provider", "mock")
+    
+    provider = get_llm_provider()
     
-    try:
-        settings.llm_provider = "mock"
-        provider = get_llm_provider()
-        
-        assert isinstance(provider, MockProvider)
-    finally:
-        settings.llm_provider = original_provider
+    assert isinstance(provider, MockProvider)
 
 
-def test_get_llm_provider_openai():
+def test_get_llm_provider_openai(monkeypatch):
     """Test getting OpenAI provider."""
-    # Save original settings
-    original_provider = settings.llm_provider
-    original_api_key = settings.openai_api_key
-    
-    try:
-        settings.llm_provider = "openai"
-        settings.openai_api_key = "test-key-123"
-        
-        provider = get_llm_provider()
-        
-        assert isinstance(provider, OpenAIProvider)
-        assert provider.client.api_key == "test-key-123"
-    finally:
-        settings.llm_provider = original_provider
-        settings.openai_api_key = original_api_key
-
-
-def test_get_llm_provider_openai_no_key():
+    monkeypatch.setattr(settings, "llm_provider", "openai")
+    monkeypatch.setattr(settings, "openai_api_key", "test-key-123")
+    
+    provider = get_llm_provider()
+    
+    assert isinstance(provider, OpenAIProvider)
+    assert provider.client.api_key == "test-key-123"
+
+
+def test_get_llm_provider_openai_no_key(monkeypatch):
     """Test that OpenAI provider requires API key."""
-    original_provider = settings.llm_provider
-    original_api_key = settings.openai_api_key
+    monkeypatch.setattr(settings, "llm_provider", "openai")
+    monkeypatch.setattr(settings, "openai_api_key", "")
     
-    try:
-        settings.llm_provider = "openai"
-        settings.openai_api_key = ""
-        
-        with pytest.raises(ValueError, match="OPENAI_API_KEY must be set"):
-            get_llm_provider()
-    finally:
-        settings.llm_provider = original_provider
-        settings.openai_api_key = original_api_key
+    with pytest.raises(ValueError, match="OPENAI_API_KEY must be set"):
+        get_llm_provider()
 
 
-def test_get_llm_provider_invalid():
+def test_get_llm_provider_invalid(monkeypatch):
     """Test invalid provider raises error."""
-    original_provider = settings.llm_provider
-    
-    try:
-        settings.llm_provider = "invalid"
-        
-        with pytest.raises(ValueError, match="Unknown LLM provider"):
-            get_llm_provider()
-    finally:
-        settings.llm_provider = original_provider
+    monkeypatch.setattr(settings, "llm_provider", "invalid")
+    
+    with pytest.raises(ValueError, match="Unknown LLM provider"):
+        get_llm_provider()
+
+
+def test_get_llm_provider_is_cached(monkeypatch):
+    """Test that the same configuration reuses the provider instance."""
+    monkeypatch.setattr(settings, "llm_provider", "openai")
+    monkeypatch.setattr(settings, "openai_api_key", "test-key-123")
+    
+    provider = get_llm_provider()
+    assert get_llm_provider() is provider
+    
+    monkeypatch.setattr(settings, "openai_api_key", "test-key-456")
+    assert get_llm_provider() is not provider
 
 
 def test_openai_provider_initialization():
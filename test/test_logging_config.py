@@ -1,14 +1,17 @@
 """Tests for logging configuration and monitoring."""
 
+import json
 import logging
-import tempfile
-from pathlib import Path
-from unittest.mock import Mock, patch
+import logging.handlers
+import time
+from unittest.mock import Mock
 import pytest
+import structlog
 
 from llm_dungeon_master.logging_config import (
     get_log_level,
     get_log_format,
+    orjson_dumps,
     setup_logging,
     get_logger,
     HealthCheckLogger,
@@ -18,50 +21,118 @@ from llm_dungeon_master.logging_config import (
 )
 
 
+@pytest.fixture(scope="module", autouse=True)
+def mute_logs():
+    """Discard log records emitted by this module's tests.
+    
+    Most tests only check that logging calls do not raise; raising the root
+    level above CRITICAL makes structlog's level filter drop each event
+    before any renderer or handler runs.
+    """
+    root = logging.getLogger()
+    original_handlers = root.handlers[:]
+    original_level = root.level
+    root.handlers = [logging.NullHandler()]
+    root.setLevel(logging.CRITICAL + 1)
+    yield
+    root.handlers = original_handlers
+    root.setLevel(original_level)
+
+
+@pytest.fixture(scope="module", params=["json", "pretty"])
+def configured_logging(request, tmp_path_factory):
+    """Run setup_logging() once per log format for the whole module.
+    
+    Yields the configured log file path. The root handlers and structlog
+    configuration in place before the fixture are restored afterwards.
+    """
+    log_file = tmp_path_factory.mktemp("logging") / "logs" / "test.log"
+    root = logging.getLogger()
+    original_handlers = root.handlers[:]
+    original_config = structlog.get_config()
+    
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("LOG_FORMAT", request.param)
+        mp.setenv("LOG_FILE", str(log_file))
+        setup_logging()
+        yield log_file
+    
+    for handler in root.handlers:
+        if handler not in original_handlers:
+            handler.close()
+    root.handlers = original_handlers
+    structlog.configure(**original_config)
+
+
+@pytest.fixture(scope="class")
+def health_logger():
+    """HealthCheckLogger shared by the tests of a class."""
+    return HealthCheckLogger()
+
+
+@pytest.fixture(scope="class")
+def api_logger():
+    """RequestLogger shared by the tests of a class."""
+    return RequestLogger()
+
+
+@pytest.fixture(scope="class")
+def llm_logger():
+    """LLMLogger shared by the tests of a class."""
+    return LLMLogger()
+
+
+@pytest.fixture(scope="class")
+def db_logger():
+    """DatabaseLogger shared by the tests of a class."""
+    return DatabaseLogger()
+
+
 class TestLoggingConfiguration:
     """Test logging configuration functions."""
     
-    def test_get_log_level_default(self):
-        """Test default log level is INFO."""
-        with patch.dict('os.environ', {}, clear=True):
-            level = get_log_level()
-            assert level == logging.INFO
-    
-    def test_get_log_level_from_env(self):
-        """Test log level can be set via environment."""
-        with patch.dict('os.environ', {'LOG_LEVEL': 'DEBUG'}):
-            level = get_log_level()
-            assert level == logging.DEBUG
+    @pytest.mark.parametrize("env_value,expected", [
+        (None, logging.INFO),
+        ("DEBUG", logging.DEBUG),
+        ("WARNING", logging.WARNING),
+        ("INVALID", logging.INFO),
+    ])
+    def test_get_log_level(self, monkeypatch, env_value, expected):
+        """Test log level defaults to INFO and can be set via environment."""
+        monkeypatch.delenv("LOG_LEVEL", raising=False)
+        if env_value is not None:
+            monkeypatch.setenv("LOG_LEVEL", env_value)
         
-        with patch.dict('os.environ', {'LOG_LEVEL': 'WARNING'}):
-            level = get_log_level()
-            assert level == logging.WARNING
-    
-    def test_get_log_level_invalid(self):
-        """Test invalid log level defaults to INFO."""
-        with patch.dict('os.environ', {'LOG_LEVEL': 'INVALID'}):
-            level = get_log_level()
-            assert level == logging.INFO
-    
-    def test_get_log_format_default(self):
-        """Test default log format is pretty."""
-        with patch.dict('os.environ', {}, clear=True):
-            fmt = get_log_format()
-            assert fmt == "pretty"
-    
-    def test_get_log_format_json(self):
-        """Test JSON log format."""
-        with patch.dict('os.environ', {'LOG_FORMAT': 'json'}):
-            fmt = get_log_format()
-            assert fmt == "json"
-    
-    def test_setup_logging_creates_log_dir(self):
+        assert get_log_level() == expected
+    
+    @pytest.mark.parametrize("env_value,expected", [
+        (None, "pretty"),
+        ("json", "json"),
+    ])
+    def test_get_log_format(self, monkeypatch, env_value, expected):
+        """Test log format defaults to pretty and can be set via environment."""
+        monkeypatch.delenv("LOG_FORMAT", raising=False)
+        if env_value is not None:
+            monkeypatch.setenv("LOG_FORMAT", env_value)
+        
+        assert get_log_format() == expected
+    
+    def test_setup_logging_creates_log_dir(self, configured_logging):
         """Test that setup_logging creates log directory."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            log_file = Path(tmpdir) / "logs" / "test.log"
-            with patch.dict('os.environ', {'LOG_FILE': str(log_file)}):
-                setup_logging()
-                assert log_file.parent.exists()
+        assert configured_logging.parent.exists()
+    
+    def test_orjson_dumps_returns_json_text(self):
+        """Test the JSON serializer returns str and handles non-JSON values."""
+        output = orjson_dumps(
+            {"event": "test", 1: "int key", "obj": object()},
+            default=repr
+        )
+        
+        assert isinstance(output, str)
+        record = json.loads(output)
+        assert record["event"] == "test"
+        assert record["1"] == "int key"
+        assert record["obj"].startswith("<object")
     
     def test_get_logger_returns_logger(self):
         """Test get_logger returns a logger instance."""
@@ -74,19 +145,10 @@ class TestLoggingConfiguration:
 class TestHealthCheckLogger:
     """Test HealthCheckLogger class."""
     
-    def test_health_check_logger_creation(self):
-        """Test creating a HealthCheckLogger."""
-        logger = HealthCheckLogger()
-        assert logger is not None
-        assert hasattr(logger, 'log_health_check')
-        assert hasattr(logger, 'log_metric')
-    
-    def test_log_health_check(self):
+    def test_log_health_check(self, health_logger):
         """Test logging a health check."""
-        logger = HealthCheckLogger()
-        
         # Should not raise exception
-        logger.log_health_check(
+        health_logger.log_health_check(
             component="database",
             status="healthy",
             details={"connection": "ok"}
@@ -95,6 +157,7 @@ class TestHealthCheckLogger:
     def test_log_health_check_with_uptime(self):
         """Test health check includes uptime."""
         logger = HealthCheckLogger()
+        logger.logger = Mock()
         
         # Log a health check
         logger.log_health_check(
@@ -103,26 +166,49 @@ class TestHealthCheckLogger:
             details={}
         )
         
-        # Uptime should be tracked (non-zero after initialization)
-        assert logger._start_time is not None
+        # Uptime is measured from the class-level monotonic start time
+        assert HealthCheckLogger._start_time > 0
+        assert logger.logger.info.call_args.kwargs["uptime_seconds"] > 0
     
-    def test_log_metric(self):
+    def test_log_metric(self, health_logger):
         """Test logging a metric."""
-        logger = HealthCheckLogger()
-        
         # Should not raise exception
-        logger.log_metric(
+        health_logger.log_metric(
             metric_name="response_time",
             value=45.2,
-            tags={"endpoint": "/health"}
+            tags=(("endpoint", "/health"),)
         )
     
-    def test_log_metric_without_tags(self):
-        """Test logging a metric without tags."""
+    def test_log_metric_tags_logged_as_mapping(self):
+        """Test tag pairs and legacy dict tags are logged as the same mapping."""
         logger = HealthCheckLogger()
+        logger.logger = Mock()
+        logger.logger.isEnabledFor.return_value = True
         
+        logger.log_metric(metric_name="response_time", value=45.2, tags=(("endpoint", "/health"),))
+        logger.log_metric(metric_name="response_time", value=45.2, tags={"endpoint": "/health"})
+        
+        first, second = logger.logger.info.call_args_list
+        assert first.kwargs["tags"] == {"endpoint": "/health"}
+        assert second.kwargs["tags"] == first.kwargs["tags"]
+    
+    def test_log_metric_tags_none_and_positional(self):
+        """Test tags=None and positional tags keep working."""
+        logger = HealthCheckLogger()
+        logger.logger = Mock()
+        logger.logger.isEnabledFor.return_value = True
+        
+        logger.log_metric("active_users", 10, None)
+        logger.log_metric("response_time", 45.2, {"endpoint": "/health"})
+        
+        first, second = logger.logger.info.call_args_list
+        assert first.kwargs["tags"] == {}
+        assert second.kwargs["tags"] == {"endpoint": "/health"}
+    
+    def test_log_metric_without_tags(self, health_logger):
+        """Test logging a metric without tags."""
         # Should not raise exception
-        logger.log_metric(
+        health_logger.log_metric(
             metric_name="active_users",
             value=10
         )
@@ -131,31 +217,20 @@ class TestHealthCheckLogger:
 class TestRequestLogger:
     """Test RequestLogger class."""
     
-    def test_request_logger_creation(self):
-        """Test creating a RequestLogger."""
-        logger = RequestLogger()
-        assert logger is not None
-        assert hasattr(logger, 'log_request')
-        assert hasattr(logger, 'log_websocket_connection')
-    
-    def test_log_request_basic(self):
+    def test_log_request_basic(self, api_logger):
         """Test logging a basic API request."""
-        logger = RequestLogger()
-        
         # Should not raise exception
-        logger.log_request(
+        api_logger.log_request(
             method="GET",
             path="/api/sessions",
             status_code=200,
             duration_ms=25.5
         )
     
-    def test_log_request_with_ids(self):
+    def test_log_request_with_ids(self, api_logger):
         """Test logging a request with user and session IDs."""
-        logger = RequestLogger()
-        
         # Should not raise exception
-        logger.log_request(
+        api_logger.log_request(
             method="POST",
             path="/api/sessions/1/messages",
             status_code=201,
@@ -164,24 +239,20 @@ class TestRequestLogger:
             session_id=1
         )
     
-    def test_log_websocket_connection(self):
+    def test_log_websocket_connection(self, api_logger):
         """Test logging a WebSocket event."""
-        logger = RequestLogger()
-        
         # Should not raise exception
-        logger.log_websocket_connection(
+        api_logger.log_websocket_connection(
             event="connect",
             session_id=1,
             player_id=5,
             connection_id="conn-123"
         )
     
-    def test_log_websocket_disconnect(self):
+    def test_log_websocket_disconnect(self, api_logger):
         """Test logging a WebSocket disconnect."""
-        logger = RequestLogger()
-        
         # Should not raise exception
-        logger.log_websocket_connection(
+        api_logger.log_websocket_connection(
             event="disconnect",
             session_id=1,
             player_id=5
@@ -191,18 +262,10 @@ class TestRequestLogger:
 class TestLLMLogger:
     """Test LLMLogger class."""
     
-    def test_llm_logger_creation(self):
-        """Test creating an LLMLogger."""
-        logger = LLMLogger()
-        assert logger is not None
-        assert hasattr(logger, 'log_llm_request')
-    
-    def test_log_llm_request_basic(self):
+    def test_log_llm_request_basic(self, llm_logger):
         """Test logging a basic LLM request."""
-        logger = LLMLogger()
-        
         # Should not raise exception
-        logger.log_llm_request(
+        llm_logger.log_llm_request(
             provider="openai",
             model="gpt-4",
             prompt_tokens=150,
@@ -210,12 +273,10 @@ class TestLLMLogger:
             duration_ms=1200.5
         )
     
-    def test_log_llm_request_with_cost(self):
+    def test_log_llm_request_with_cost(self, llm_logger):
         """Test logging LLM request with cost."""
-        logger = LLMLogger()
-        
         # Should not raise exception
-        logger.log_llm_request(
+        llm_logger.log_llm_request(
             provider="openai",
             model="gpt-4",
             prompt_tokens=150,
@@ -224,11 +285,44 @@ class TestLLMLogger:
             cost_usd=0.0035
         )
     
-    def test_log_llm_request_tracks_total_tokens(self):
+    def test_log_llm_request_tracks_total_tokens(self, llm_logger):
         """Test that total tokens are calculated."""
+        # Log a request (total_tokens should be calculated internally)
+        llm_logger.log_llm_request(
+            provider="openai",
+            model="gpt-4",
+            prompt_tokens=100,
+            completion_tokens=50,
+            duration_ms=1000.0
+        )
+        # No assertion needed - just verify it doesn't crash
+    
+    def test_log_llm_request_reuses_bound_logger(self):
+        """Test that the provider/model context is bound once and reused."""
         logger = LLMLogger()
+        logger.logger = Mock()
+        logger.logger.isEnabledFor.return_value = True
+        
+        for prompt_tokens in (100, 200):
+            logger.log_llm_request(
+                provider="openai",
+                model="gpt-4",
+                prompt_tokens=prompt_tokens,
+                completion_tokens=50,
+                duration_ms=1000.0
+            )
+        
+        logger.logger.bind.assert_called_once_with(provider="openai", model="gpt-4")
+        bound = logger.logger.bind.return_value
+        assert bound.info.call_count == 2
+        assert bound.info.call_args.kwargs["total_tokens"] == 250
+    
+    def test_log_llm_request_skipped_when_disabled(self):
+        """Test that nothing is logged when INFO is disabled."""
+        logger = LLMLogger()
+        logger.logger = Mock()
+        logger.logger.isEnabledFor.return_value = False
         
-        # Log a request (total_tokens should be calculated internally)
         logger.log_llm_request(
             provider="openai",
             model="gpt-4",
@@ -236,79 +330,122 @@ class TestLLMLogger:
             completion_tokens=50,
             duration_ms=1000.0
         )
-        # No assertion needed - just verify it doesn't crash
+        
+        logger.logger.isEnabledFor.assert_called_once_with(logging.INFO)
+        logger.logger.info.assert_not_called()
 
 
 class TestDatabaseLogger:
     """Test DatabaseLogger class."""
     
-    def test_database_logger_creation(self):
-        """Test creating a DatabaseLogger."""
-        logger = DatabaseLogger()
-        assert logger is not None
-        assert hasattr(logger, 'log_query')
-        assert hasattr(logger, 'log_connection_pool_stats')
-    
-    def test_log_query_basic(self):
+    def test_log_query_basic(self, db_logger):
         """Test logging a basic database query."""
-        logger = DatabaseLogger()
-        
         # Should not raise exception
-        logger.log_query(
+        db_logger.log_query(
             query_type="SELECT",
             table="sessions",
             duration_ms=5.2
         )
     
-    def test_log_query_with_rows_affected(self):
+    def test_log_query_with_rows_affected(self, db_logger):
         """Test logging query with rows affected."""
-        logger = DatabaseLogger()
-        
         # Should not raise exception
-        logger.log_query(
+        db_logger.log_query(
             query_type="UPDATE",
             table="characters",
             duration_ms=8.5,
             rows_affected=3
         )
     
-    def test_log_connection_pool_stats(self):
+    def test_log_connection_pool_stats(self, db_logger):
         """Test logging connection pool statistics."""
-        logger = DatabaseLogger()
-        
         # Should not raise exception
-        logger.log_connection_pool_stats(
+        db_logger.log_connection_pool_stats(
             active=5,
             idle=10,
             max_size=20
         )
     
-    def test_log_connection_pool_calculates_utilization(self):
+    def test_log_connection_pool_calculates_utilization(self, db_logger):
         """Test that pool utilization is calculated."""
-        logger = DatabaseLogger()
-        
         # Should calculate 50% utilization (10/20)
-        logger.log_connection_pool_stats(
+        db_logger.log_connection_pool_stats(
             active=10,
             idle=5,
             max_size=20
         )
     
-    def test_log_connection_pool_zero_max_size(self):
+    def test_log_connection_pool_zero_max_size(self, db_logger):
         """Test pool stats with zero max size doesn't crash."""
-        logger = DatabaseLogger()
-        
         # Should not crash with division by zero
-        logger.log_connection_pool_stats(
+        db_logger.log_connection_pool_stats(
             active=0,
             idle=0,
             max_size=0
         )
 
 
+class TestLoggingThroughput:
+    """Guard against per-record I/O creeping into the logging hot path."""
+    
+    RECORDS_PER_LOGGER = 1000
+    # Generous per-record budget: rendering takes tens of microseconds, while
+    # a sync or flush per record would cost milliseconds.
+    MAX_NS_PER_RECORD = 1_000_000
+    
+    @pytest.mark.slow
+    def test_bulk_logging_throughput(self, health_logger, api_logger, llm_logger, db_logger):
+        """Test bulk logging through every logger stays within the time budget."""
+        buffer = logging.handlers.MemoryHandler(capacity=1024, target=logging.NullHandler())
+        root = logging.getLogger()
+        muted_handlers = root.handlers
+        muted_level = root.level
+        root.handlers = [buffer]
+        root.setLevel(logging.INFO)
+        try:
+            start = time.perf_counter_ns()
+            for _ in range(self.RECORDS_PER_LOGGER):
+                health_logger.log_metric(metric_name="response_time", value=45.2)
+                api_logger.log_request(
+                    method="GET",
+                    path="/health",
+                    status_code=200,
+                    duration_ms=1.5
+                )
+                llm_logger.log_llm_request(
+                    provider="openai",
+                    model="gpt-4",
+                    prompt_tokens=100,
+                    completion_tokens=50,
+                    duration_ms=1000.0
+                )
+                db_logger.log_query(query_type="SELECT", table="sessions", duration_ms=5.2)
+            elapsed_ns = time.perf_counter_ns() - start
+        finally:
+            root.handlers = muted_handlers
+            root.setLevel(muted_level)
+            buffer.close()
+        
+        records = 4 * self.RECORDS_PER_LOGGER
+        assert elapsed_ns < records * self.MAX_NS_PER_RECORD
+
+
 class TestLoggingIntegration:
     """Integration tests for logging system."""
     
+    @pytest.mark.parametrize("logger_class,methods", [
+        (HealthCheckLogger, ("log_health_check", "log_metric")),
+        (RequestLogger, ("log_request", "log_websocket_connection")),
+        (LLMLogger, ("log_llm_request",)),
+        (DatabaseLogger, ("log_query", "log_connection_pool_stats")),
+    ])
+    def test_logger_creation(self, logger_class, methods):
+        """Test creating each logger class and its logging methods."""
+        logger = logger_class()
+        assert logger is not None
+        for method in methods:
+            assert callable(getattr(logger_class, method, None)), method
+    
     def test_all_loggers_available(self):
         """Test that all logger instances are available."""
         from llm_dungeon_master.logging_config import (
@@ -323,25 +460,25 @@ class TestLoggingIntegration:
         assert llm_logger is not None
         assert database_logger is not None
     
-    def test_logging_with_different_formats(self):
+    def test_logging_with_different_formats(self, configured_logging):
         """Test logging works with both JSON and pretty formats."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            log_file = Path(tmpdir) / "test.log"
-            
-            # Test JSON format
-            with patch.dict('os.environ', {
-                'LOG_FORMAT': 'json',
-                'LOG_FILE': str(log_file)
-            }):
-                setup_logging()
-                logger = get_logger("test")
-                logger.info("test message", key="value")
-            
-            # Test pretty format
-            with patch.dict('os.environ', {
-                'LOG_FORMAT': 'pretty',
-                'LOG_FILE': str(log_file)
-            }):
-                setup_logging()
-                logger = get_logger("test")
-                logger.info("test message", key="value")
+        root = logging.getLogger()
+        muted_level = root.level
+        root.setLevel(logging.INFO)
+        try:
+            logger = get_logger("test")
+            logger.info("test message", key="value")
+        finally:
+            root.setLevel(muted_level)
+        
+        for handler in root.handlers:
+            handler.flush()
+        output = configured_logging.read_text()
+        assert "test message" in output
+        
+        if get_log_format() == "json":
+            renderer = structlog.get_config()["processors"][-1]
+            assert isinstance(renderer, structlog.processors.JSONRenderer)
+            record = json.loads(output.splitlines()[-1])
+            assert record["event"] == "test message"
+            assert record["key"] == "value"
@@ -2,16 +2,48 @@
 
 import pytest
 from datetime import datetime
+from sqlalchemy import bindparam
 from sqlmodel import Session, select
 
 from llm_dungeon_master.models import Player, Session as GameSession, Character, Message, SessionPlayer
 
 
+# Statements built once and reused with bound parameters
+PLAYER_WITH_CHARACTERS = select(Player.id).where(
+    Player.id == bindparam("player_id"),
+    Player.characters.any()
+).limit(1)
+MESSAGES_BY_SESSION = select(Message).where(Message.session_id == bindparam("session_id"))
+
+# (message_type, sender_name, content) rows for test_message_types
+MESSAGE_ROWS = (
+    ("player", "Sender-player", "Test message of type player"),
+    ("dm", "Sender-dm", "Test message of type dm"),
+    ("system", "Sender-system", "Test message of type system"),
+)
+MESSAGE_TYPES = frozenset(message_type for message_type, _, _ in MESSAGE_ROWS)
+
+# Character created with only the required fields, and the defaults it gets
+DEFAULT_CHARACTER_FIELDS = {"name": "Default Character", "race": "Human", "char_class": "Fighter"}
+DEFAULT_CHARACTER_STATS = (
+    ("level", 1),
+    ("strength", 10),
+    ("dexterity", 10),
+    ("constitution", 10),
+    ("intelligence", 10),
+    ("wisdom", 10),
+    ("charisma", 10),
+    ("max_hp", 10),
+    ("current_hp", 10),
+    ("armor_class", 10),
+)
+
+
 def test_create_player(session: Session):
     """Test creating a player."""
     player = Player(name="Aragorn")
     session.add(player)
-    session.commit()
+    session.flush()
     session.refresh(player)
     
     assert player.id is not None
@@ -23,7 +55,7 @@ def test_create_game_session(session: Session):
     """Test creating a game session."""
     game_session = GameSession(name="Test Adventure", dm_name="Dungeon Master")
     session.add(game_session)
-    session.commit()
+    session.flush()
     session.refresh(game_session)
     
     assert game_session.id is not None
@@ -52,7 +84,7 @@ def test_create_character(session: Session, sample_player: Player):
         armor_class=13
     )
     session.add(character)
-    session.commit()
+    session.flush()
     session.refresh(character)
     
     assert character.id is not None
@@ -80,12 +112,14 @@ def test_character_relationship(session: Session, sample_player: Player):
     session.add(character)
     session.commit()
     
-    # Query player and check characters
-    statement = select(Player).where(Player.id == sample_player.id)
-    player = session.exec(statement).first()
+    # Check through the relationship that the player has characters,
+    # without loading the Player or Character rows
+    player_id = session.exec(
+        PLAYER_WITH_CHARACTERS,
+        params={"player_id": sample_player.id}
+    ).first()
     
-    assert player is not None
-    assert len(player.characters) > 0
+    assert player_id == sample_player.id
 
 
 def test_create_message(session: Session, sample_session: GameSession):
@@ -97,7 +131,7 @@ def test_create_message(session: Session, sample_session: GameSession):
         message_type="player"
     )
     session.add(message)
-    session.commit()
+    session.flush()
     session.refresh(message)
     
     assert message.id is not None
@@ -110,25 +144,22 @@ def test_create_message(session: Session, sample_session: GameSession):
 
 def test_message_types(session: Session, sample_session: GameSession):
     """Test different message types."""
-    types = ["player", "dm", "system"]
-    
-    for msg_type in types:
-        message = Message(
+    session.add_all([
+        Message(
             session_id=sample_session.id,
-            sender_name=f"Sender-{msg_type}",
-            content=f"Test message of type {msg_type}",
+            sender_name=sender_name,
+            content=content,
             message_type=msg_type
         )
-        session.add(message)
-    
+        for msg_type, sender_name, content in MESSAGE_ROWS
+    ])
     session.commit()
     
     # Query messages
-    statement = select(Message).where(Message.session_id == sample_session.id)
-    messages = session.exec(statement).all()
+    messages = session.exec(MESSAGES_BY_SESSION, params={"session_id": sample_session.id}).all()
     
     assert len(messages) == 3
-    assert all(msg.message_type in types for msg in messages)
+    assert all(msg.message_type in MESSAGE_TYPES for msg in messages)
 
 
 def test_session_player_link(session: Session, sample_player: Player, sample_session: GameSession, sample_character: Character):
@@ -139,7 +170,7 @@ def test_session_player_link(session: Session, sample_player: Player, sample_ses
         character_id=sample_character.id
     )
     session.add(session_player)
-    session.commit()
+    session.flush()
     session.refresh(session_player)
     
     assert session_player.id is not None
@@ -151,24 +182,11 @@ def test_session_player_link(session: Session, sample_player: Player, sample_ses
 
 def test_character_default_stats(session: Session, sample_player: Player):
     """Test character default stats."""
-    character = Character(
-        player_id=sample_player.id,
-        name="Default Character",
-        race="Human",
-        char_class="Fighter"
-    )
+    character = Character(player_id=sample_player.id, **DEFAULT_CHARACTER_FIELDS)
     session.add(character)
-    session.commit()
+    session.flush()
     session.refresh(character)
     
     # Check defaults
-    assert character.level == 1
-    assert character.strength == 10
-    assert character.dexterity == 10
-    assert character.constitution == 10
-    assert character.intelligence == 10
-    assert character.wisdom == 10
-    assert character.charisma == 10
-    assert character.max_hp == 10
-    assert character.current_hp == 10
-    assert character.armor_class == 10
+    for field, expected in DEFAULT_CHARACTER_STATS:
+        assert getattr(character, field) == expected, field
@@ -1,12 +1,12 @@
 """Tests for multiplayer functionality."""
 
 import pytest
-from datetime import datetime, UTC, timedelta
-from sqlmodel import Session, create_engine, SQLModel
+from datetime import datetime, UTC
+from freezegun import freeze_time
 
 from llm_dungeon_master.models import (
     Player, Session as GameSession, Character, SessionPlayer,
-    Turn, TurnAction, PlayerPresence, ReconnectionToken
+    Turn, TurnAction, PlayerPresence
 )
 from llm_dungeon_master.turn_manager import TurnManager, TurnStatus
 from llm_dungeon_master.presence_manager import PresenceManager, PresenceStatus
@@ -14,19 +14,46 @@ from llm_dungeon_master.sync_manager import SyncManager, ConflictType, Resolutio
 from llm_dungeon_master.reconnection_manager import ReconnectionManager
 
 
-@pytest.fixture
-def engine():
-    """Create a test database engine."""
-    engine = create_engine("sqlite:///:memory:")
-    SQLModel.metadata.create_all(engine)
-    return engine
+# One character per test player, in the same order as test_players
+CHARACTER_TEMPLATES = (
+    {
+        "name": "Aragorn",
+        "race": "Human",
+        "char_class": "Fighter",
+        "initiative_bonus": 2,
+        "strength": 16,
+        "dexterity": 14,
+    },
+    {
+        "name": "Gandalf",
+        "race": "Human",
+        "char_class": "Wizard",
+        "initiative_bonus": 1,
+        "intelligence": 18,
+        "wisdom": 16,
+    },
+    {
+        "name": "Legolas",
+        "race": "Elf",
+        "char_class": "Ranger",
+        "initiative_bonus": 3,
+        "dexterity": 18,
+        "wisdom": 14,
+    },
+)
 
 
 @pytest.fixture
-def db_session(engine):
-    """Create a test database session."""
-    with Session(engine) as session:
-        yield session
+def db_session(session):
+    """Create a test database session.
+    
+    Alias of the conftest ``session`` fixture: the shared engine builds the
+    schema once and each test is rolled back through a SAVEPOINT. Objects
+    are not expired on commit, so the fixtures below can hand them out
+    without a refresh.
+    """
+    session.expire_on_commit = False
+    return session
 
 
 @pytest.fixture
@@ -35,7 +62,6 @@ def test_session(db_session):
     session = GameSession(name="Test Session", dm_name="Test DM")
     db_session.add(session)
     db_session.commit()
-    db_session.refresh(session)
     return session
 
 
@@ -47,11 +73,8 @@ def test_players(db_session):
         Player(name="Bob"),
         Player(name="Charlie")
     ]
-    for player in players:
-        db_session.add(player)
+    db_session.add_all(players)
     db_session.commit()
-    for player in players:
-        db_session.refresh(player)
     return players
 
 
@@ -59,42 +82,26 @@ def test_players(db_session):
 def test_characters(db_session, test_players):
     """Create test characters."""
     characters = [
-        Character(
-            player_id=test_players[0].id,
-            name="Aragorn",
-            race="Human",
-            char_class="Fighter",
-            initiative_bonus=2,
-            strength=16,
-            dexterity=14
-        ),
-        Character(
-            player_id=test_players[1].id,
-            name="Gandalf",
-            race="Human",
-            char_class="Wizard",
-            initiative_bonus=1,
-            intelligence=18,
-            wisdom=16
-        ),
-        Character(
-            player_id=test_players[2].id,
-            name="Legolas",
-            race="Elf",
-            char_class="Ranger",
-            initiative_bonus=3,
-            dexterity=18,
-            wisdom=14
-        )
+        Character(player_id=player.id, **template)
+        for player, template in zip(test_players, CHARACTER_TEMPLATES)
     ]
-    for char in characters:
-        db_session.add(char)
+    db_session.add_all(characters)
     db_session.commit()
-    for char in characters:
-        db_session.refresh(char)
     return characters
 
 
+@pytest.fixture
+def session_players(db_session, test_session, test_players):
+    """Add every test player to the test session."""
+    session_players = [
+        SessionPlayer(session_id=test_session.id, player_id=player.id)
+        for player in test_players
+    ]
+    db_session.add_all(session_players)
+    db_session.commit()
+    return session_players
+
+
 # Turn Management Tests
 class TestTurnManager:
     """Tests for TurnManager."""
@@ -200,7 +207,7 @@ class TestTurnManager:
         assert action.action_type == "attack"
         assert action.description == "Attacks the goblin"
     
-    def test_get_turn_history(self, db_session, test_session, test_characters):
+    def test_get_turn_history(self, db_session, test_session, test_characters, query_counter):
         """Test getting turn history."""
         turn_manager = TurnManager(db_session)
         char_ids = [c.id for c in test_characters]
@@ -210,13 +217,17 @@ class TestTurnManager:
         current = turn_manager.get_current_turn(test_session.id)
         turn_manager.record_action(test_session.id, current.character_id, "attack", "Attack 1")
         
-        history = turn_manager.get_turn_history(test_session.id)
+        # One query for the turns and one selectin query for all their actions
+        session_id = test_session.id
+        with query_counter() as qc:
+            history = turn_manager.get_turn_history(session_id)
         
+        assert qc.count <= 2
         assert len(history) > 0
         # History is in reverse order (most recent first)
         assert history[0]["character_name"] in ["Legolas", "Aragorn", "Gandalf"]
         # Find the entry with actions
-        entry_with_actions = next((h for h in history if len(h["actions"]) > 0), None)
+        entry_with_actions = next((h for h in history if h["has_actions"]), None)
         assert entry_with_actions is not None
         assert len(entry_with_actions["actions"]) == 1
 
@@ -239,70 +250,52 @@ class TestPresenceManager:
         assert presence.status == PresenceStatus.ONLINE
         assert presence.connection_id == "conn_123"
     
-    def test_update_heartbeat(self, db_session, test_session, test_players):
-        """Test updating heartbeat."""
-        presence_manager = PresenceManager(db_session)
-        presence_manager.track_connection(test_session.id, test_players[0].id, "conn_123")
-        
-        success = presence_manager.update_heartbeat(
-            test_session.id,
-            test_players[0].id,
-            "conn_123"
-        )
-        
-        assert success
-    
-    def test_disconnect(self, db_session, test_session, test_players):
-        """Test disconnecting a player."""
+    @pytest.mark.parametrize("action,expected_status", [
+        ("track_connection", PresenceStatus.ONLINE),
+        ("update_heartbeat", PresenceStatus.ONLINE),
+        ("disconnect", PresenceStatus.OFFLINE),
+    ])
+    def test_presence_action(
+        self, db_session, test_session, test_players, action, expected_status
+    ):
+        """Test each connection action on a tracked player."""
         presence_manager = PresenceManager(db_session)
         presence_manager.track_connection(test_session.id, test_players[0].id, "conn_123")
         
-        success = presence_manager.disconnect(
+        result = getattr(presence_manager, action)(
             test_session.id,
             test_players[0].id,
             "conn_123"
         )
         
-        assert success
+        assert result
         status = presence_manager.get_player_status(test_session.id, test_players[0].id)
-        assert status == PresenceStatus.OFFLINE
+        assert status == expected_status
     
-    def test_get_presence_summary(self, db_session, test_session, test_players):
+    def test_get_presence_summary(
+        self, db_session, test_session, test_players, session_players, query_counter
+    ):
         """Test getting presence summary."""
         presence_manager = PresenceManager(db_session)
         
-        # Add session players
-        for player in test_players:
-            session_player = SessionPlayer(
-                session_id=test_session.id,
-                player_id=player.id
-            )
-            db_session.add(session_player)
-        db_session.commit()
-        
         # Track some connections
         presence_manager.track_connection(test_session.id, test_players[0].id, "conn_1")
         presence_manager.track_connection(test_session.id, test_players[1].id, "conn_2")
         
-        summary = presence_manager.get_presence_summary(test_session.id)
+        # Session players, their player rows and presences: no per-player queries
+        session_id = test_session.id
+        with query_counter() as qc:
+            summary = presence_manager.get_presence_summary(session_id)
         
+        assert qc.count <= 3
         assert summary["total_players"] == 3
         assert summary["online"] >= 2
         assert len(summary["players"]) == 3
     
-    def test_check_all_ready(self, db_session, test_session, test_players):
+    def test_check_all_ready(self, db_session, test_session, test_players, session_players):
         """Test checking if all online."""
         presence_manager = PresenceManager(db_session)
         
-        # Add session players
-        for player in test_players:
-            session_player = SessionPlayer(
-                session_id=test_session.id,
-                player_id=player.id
-            )
-            db_session.add(session_player)
-        db_session.commit()
-        
         # Connect all players
         for i, player in enumerate(test_players):
             presence_manager.track_connection(
@@ -440,6 +433,7 @@ class TestReconnectionManager:
         assert result["session_id"] == test_session.id
         assert "session_state" in result
     
+    @freeze_time("2025-01-01")
     def test_token_expires(self, db_session, test_session, test_players):
         """Test that expired tokens are invalid."""
         reconnection_manager = ReconnectionManager(db_session)
@@ -449,20 +443,26 @@ class TestReconnectionManager:
             test_session.id
         )
         
-        # Manually expire the token
-        import hashlib
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
-        from sqlmodel import select
-        statement = select(ReconnectionToken).where(ReconnectionToken.token == token_hash)
-        token_record = db_session.exec(statement).first()
-        token_record.expires_at = datetime.now(UTC) - timedelta(hours=1)
-        db_session.commit()
-        
-        # Should be invalid now
-        validated = reconnection_manager.validate_token(token)
+        # Should be invalid once the 24 hour expiry has passed
+        with freeze_time("2025-01-03"):
+            validated = reconnection_manager.validate_token(token)
         assert validated is None
     
-    def test_restore_session_state(self, db_session, test_session, test_players, test_characters):
+    def test_expire_token(self, db_session, test_session, test_players):
+        """Test expiring a token immediately."""
+        reconnection_manager = ReconnectionManager(db_session)
+        
+        token = reconnection_manager.create_reconnection_token(
+            test_players[0].id,
+            test_session.id
+        )
+        
+        assert reconnection_manager.expire_token(token)
+        assert reconnection_manager.validate_token(token) is None
+    
+    def test_restore_session_state(
+        self, db_session, test_session, test_players, test_characters, query_counter
+    ):
         """Test restoring session state."""
         reconnection_manager = ReconnectionManager(db_session)
         
@@ -475,11 +475,11 @@ class TestReconnectionManager:
         db_session.add(session_player)
         db_session.commit()
         
-        state = reconnection_manager.restore_session_state(
-            test_players[0].id,
-            test_session.id
-        )
+        player_id, session_id = test_players[0].id, test_session.id
+        with query_counter() as qc:
+            state = reconnection_manager.restore_session_state(player_id, session_id)
         
+        assert qc.count <= 5
         assert state["session_id"] == test_session.id
         assert state["character"] is not None
         assert state["character"]["name"] == "Aragorn"
@@ -32,6 +32,17 @@ def test_get_start_session_message():
     assert len(message["content"]) > 0
 
 
+def test_prompt_messages_are_independent():
+    """Test mutating a returned message does not affect later calls."""
+    message = get_dm_system_message()
+    message["content"] += " Extra instructions."
+    assert get_dm_system_message()["content"] == SYSTEM_PROMPT
+    
+    message = get_start_session_message()
+    message["content"] = ""
+    assert get_start_session_message()["content"] == START_SESSION_PROMPT
+
+
 def test_format_roll_prompt():
     """Test formatting a roll prompt."""
     prompt = format_roll_prompt(
@@ -3,9 +3,10 @@
 import pytest
 from pathlib import Path
 from datetime import datetime, timedelta, UTC
-from sqlmodel import create_engine, Session as DBSession, SQLModel
+from sqlmodel import Session as DBSession
 import tempfile
 import json
+import io
 
 from llm_dungeon_master.models import (
     Session, Player, Character, Message, Roll, CombatEncounter
@@ -14,25 +15,45 @@ from llm_dungeon_master.qol import (
     SessionStateManager, MessageHistoryManager, StatisticsTracker, AliasManager
 )
 
+# Save directory on the pyfakefs in-memory filesystem used by save/load tests
+SAVE_DIR = Path("/saves")
 
-@pytest.fixture
-def db():
-    """Create an in-memory database for testing."""
-    engine = create_engine("sqlite:///:memory:")
-    SQLModel.metadata.create_all(engine)
+
+@pytest.fixture(scope="module")
+def module_connection(engine):
+    """Connection whose outer transaction is rolled back after the module."""
+    connection = engine.connect()
+    transaction = connection.begin()
     
-    with DBSession(engine) as session:
-        yield session
+    yield connection
+    
+    transaction.rollback()
+    connection.close()
 
 
 @pytest.fixture
-def sample_session(db):
-    """Create a sample session with data."""
-    # Create player
+def db(module_connection):
+    """Create a database session for testing.
+    
+    Each test runs inside a SAVEPOINT on the module connection, so it sees the
+    shared sample data and its own changes are rolled back afterwards.
+    """
+    savepoint = module_connection.begin_nested()
+    session = DBSession(bind=module_connection, join_transaction_mode="create_savepoint")
+    
+    yield session
+    
+    session.close()
+    savepoint.rollback()
+
+
+def create_sample_data(db):
+    """Insert a session with a player, character, messages, rolls and an encounter."""
+    # Create player and session; flush assigns the ids the rows below need
     player = Player(name="test_player")
-    db.add(player)
-    db.commit()
-    db.refresh(player)
+    session = Session(name="Test Session")
+    db.add_all([player, session])
+    db.flush()
     
     # Create character
     character = Character(
@@ -51,37 +72,32 @@ def sample_session(db):
         charisma=11
     )
     db.add(character)
-    db.commit()
-    db.refresh(character)
-    
-    # Create session
-    session = Session(name="Test Session")
-    db.add(session)
-    db.commit()
-    db.refresh(session)
+    db.flush()
     
     # Create messages
-    for i in range(10):
-        message = Message(
-            session_id=session.id,
-            sender_name="test_player" if i % 2 == 0 else "DM",
-            content=f"Test message {i}",
-            message_type="player" if i % 2 == 0 else "dm"
-        )
-        db.add(message)
+    messages = [
+        {
+            "session_id": session.id,
+            "sender_name": "test_player" if i % 2 == 0 else "DM",
+            "content": f"Test message {i}",
+            "message_type": "player" if i % 2 == 0 else "dm"
+        }
+        for i in range(10)
+    ]
     
     # Create rolls
-    for i in range(5):
-        roll = Roll(
-            session_id=session.id,
-            character_id=character.id,
-            roll_type="attack",
-            formula="1d20",
-            result=15 + i,
-            rolls=f"[{15 + i}]",  # JSON string of rolls
-            modifier=3
-        )
-        db.add(roll)
+    rolls = [
+        {
+            "session_id": session.id,
+            "character_id": character.id,
+            "roll_type": "attack",
+            "formula": "1d20",
+            "result": 15 + i,
+            "rolls": f"[{15 + i}]",  # JSON string of rolls
+            "modifier": 3
+        }
+        for i in range(5)
+    ]
     
     # Create combat encounter
     encounter = CombatEncounter(
@@ -90,13 +106,27 @@ def sample_session(db):
         is_active=False,
         round_number=5
     )
-    db.add(encounter)
     
+    # Throwaway rows whose ids are never read: one executemany per table
+    db.bulk_insert_mappings(Message, messages)
+    db.bulk_insert_mappings(Roll, rolls)
+    db.add(encounter)
     db.commit()
     
     return session, player, character
 
 
+@pytest.fixture(scope="module")
+def sample_session(module_connection):
+    """Create the sample data once for every test in the module."""
+    with DBSession(
+        bind=module_connection,
+        join_transaction_mode="create_savepoint",
+        expire_on_commit=False,
+    ) as db:
+        return create_sample_data(db)
+
+
 # ============================================================================
 # Session State Manager Tests
 # ============================================================================
@@ -104,105 +134,104 @@ def sample_session(db):
 class TestSessionStateManager:
     """Tests for session save/load functionality."""
     
-    def test_save_session(self, db, sample_session):
+    def test_save_session(self, db, sample_session, fs):
         """Test saving session state."""
         session, player, character = sample_session
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manager = SessionStateManager(db, Path(tmpdir))
-            filepath = manager.save_session(session.id)
-            
-            assert filepath.exists()
-            assert filepath.suffix == ".json"
-            assert f"session_{session.id}_" in filepath.name
+        manager = SessionStateManager(db, SAVE_DIR)
+        filepath = manager.save_session(session.id)
+        
+        assert filepath.exists()
+        assert filepath.suffix == ".json"
+        assert f"session_{session.id}_" in filepath.name
     
-    def test_save_session_with_metadata(self, db, sample_session):
+    def test_save_session_with_metadata(self, db, sample_session, fs):
         """Test saving with custom metadata."""
         session, player, character = sample_session
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manager = SessionStateManager(db, Path(tmpdir))
-            metadata = {"note": "Important save"}
-            filepath = manager.save_session(session.id, metadata)
-            
-            # Load and check metadata
-            with open(filepath) as f:
-                data = json.load(f)
-            
-            assert data["metadata"]["note"] == "Important save"
+        manager = SessionStateManager(db, SAVE_DIR)
+        metadata = {"note": "Important save"}
+        filepath = manager.save_session(session.id, metadata)
+        
+        # Load and check metadata
+        with open(filepath) as f:
+            data = json.load(f)
+        
+        assert data["metadata"]["note"] == "Important save"
     
-    def test_load_session(self, db, sample_session):
+    def test_load_session(self, db, sample_session, fs):
         """Test loading session state."""
         session, player, character = sample_session
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manager = SessionStateManager(db, Path(tmpdir))
-            
-            # Save then load
-            filepath = manager.save_session(session.id)
-            snapshot = manager.load_session(filepath)
-            
-            assert snapshot.session_id == session.id
-            assert snapshot.session_name == session.name
-            assert len(snapshot.recent_messages) == 10
+        manager = SessionStateManager(db, SAVE_DIR)
+        
+        # Save then load
+        filepath = manager.save_session(session.id)
+        snapshot = manager.load_session(filepath)
+        
+        assert snapshot.session_id == session.id
+        assert snapshot.session_name == session.name
+        assert len(snapshot.recent_messages) == 10
     
-    def test_list_saves(self, db, sample_session):
+    def test_list_saves(self, db, sample_session, fs):
         """Test listing save files."""
         session, player, character = sample_session
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manager = SessionStateManager(db, Path(tmpdir))
-            
-            # Create multiple saves
-            manager.save_session(session.id)
-            manager.save_session(session.id)
-            
-            saves = manager.list_saves(session.id)
-            assert len(saves) >= 2
+        manager = SessionStateManager(db, SAVE_DIR)
+        
+        # Create multiple saves; file names have one-second resolution, so
+        # back-date the first one to keep the second from overwriting it
+        first = manager.save_session(session.id)
+        first.rename(SAVE_DIR / f"session_{session.id}_20240101_000000.json")
+        manager.save_session(session.id)
+        
+        saves = manager.list_saves(session.id)
+        assert len(saves) == 2
     
-    def test_get_save_info(self, db, sample_session):
+    def test_get_save_info(self, db, sample_session, fs):
         """Test getting save file info."""
         session, player, character = sample_session
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manager = SessionStateManager(db, Path(tmpdir))
-            filepath = manager.save_session(session.id)
-            
-            info = manager.get_save_info(filepath)
-            
-            assert info["session_id"] == session.id
-            assert info["session_name"] == session.name
-            assert info["num_messages"] == 10
+        manager = SessionStateManager(db, SAVE_DIR)
+        filepath = manager.save_session(session.id)
+        
+        info = manager.get_save_info(filepath)
+        
+        assert info["session_id"] == session.id
+        assert info["session_name"] == session.name
+        assert info["num_messages"] == 10
     
-    def test_delete_save(self, db, sample_session):
+    def test_delete_save(self, db, sample_session, fs):
         """Test deleting a save file."""
         session, player, character = sample_session
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manager = SessionStateManager(db, Path(tmpdir))
-            filepath = manager.save_session(session.id)
-            
-            assert filepath.exists()
-            
-            success = manager.delete_save(filepath)
-            assert success
-            assert not filepath.exists()
+        manager = SessionStateManager(db, SAVE_DIR)
+        filepath = manager.save_session(session.id)
+        
+        assert filepath.exists()
+        
+        success = manager.delete_save(filepath)
+        assert success
+        assert not filepath.exists()
     
-    def test_auto_save(self, db, sample_session):
+    def test_auto_save(self, db, sample_session, fs):
         """Test auto-save functionality."""
         session, player, character = sample_session
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manager = SessionStateManager(db, Path(tmpdir))
-            
-            # Create multiple auto-saves
-            for _ in range(6):
-                manager.auto_save(session.id)
-            
-            saves = [s for s in manager.list_saves(session.id) if "_auto_" in s.name]
-            
-            # Should keep only 5 most recent
-            assert len(saves) <= 5
+        manager = SessionStateManager(db, SAVE_DIR)
+        
+        # Existing auto-saves only need the right names for the retention policy
+        for day in range(1, 6):
+            (SAVE_DIR / f"session_{session.id}_auto_202401{day:02d}_000000.json").write_text("{}")
+        
+        filepath = manager.auto_save(session.id)
+        
+        saves = [s for s in manager.list_saves(session.id) if "_auto_" in s.name]
+        
+        # Should keep only 5 most recent, including the new one
+        assert len(saves) == 5
+        assert filepath in saves
+        assert not (SAVE_DIR / f"session_{session.id}_auto_20240101_000000.json").exists()
 
 
 # ============================================================================
@@ -222,7 +251,7 @@ class TestMessageHistoryManager:
         assert len(messages) == 5
         # Should be in chronological order
         for i in range(len(messages) - 1):
-            assert messages[i].timestamp <= messages[i + 1].timestamp
+            assert messages[i].created_at <= messages[i + 1].created_at
     
     def test_search_messages(self, db, sample_session):
         """Test searching messages."""
@@ -234,6 +263,24 @@ class TestMessageHistoryManager:
         assert len(messages) >= 1
         assert "5" in messages[0].content
     
+    def test_search_matches_word_prefixes(self, db, sample_session):
+        """Test full-text search matches every term as a word prefix."""
+        session, player, character = sample_session
+        
+        manager = MessageHistoryManager(db)
+        messages = manager.search_messages(session.id, 'mess "5')
+        
+        assert [msg.content for msg in messages] == ["Test message 5"]
+    
+    def test_search_does_not_match_mid_word(self, db, sample_session):
+        """Test full-text search does not match fragments inside a word."""
+        session, player, character = sample_session
+        
+        manager = MessageHistoryManager(db)
+        
+        assert manager.search_messages(session.id, "ssage") == []
+        assert len(manager.search_messages(session.id, "message")) == 10
+    
     def test_search_by_sender(self, db, sample_session):
         """Test filtering by sender."""
         session, player, character = sample_session
@@ -272,6 +319,8 @@ class TestMessageHistoryManager:
         assert stats["total_messages"] == 10
         assert "test_player" in stats["by_sender"]
         assert "DM" in stats["by_sender"]
+        assert stats["by_type"] == {"player": 5, "dm": 5}
+        assert stats["first_message"] <= stats["last_message"]
     
     def test_export_text(self, db, sample_session):
         """Test exporting as text."""
@@ -292,7 +341,13 @@ class TestMessageHistoryManager:
         
         data = json.loads(json_str)
         assert len(data) == 10
-        assert data[0]["sender_name"] in ["test_player", "DM"]
+        assert set(data[0]) == {"id", "sender", "content", "type", "timestamp"}
+        assert data[0]["sender"] in ["test_player", "DM"]
+        
+        # One compact object per line inside the array
+        lines = json_str.splitlines()
+        assert lines[0] == "[" and lines[-1] == "]"
+        assert [json.loads(line.rstrip(",")) for line in lines[1:-1]] == data
     
     def test_export_markdown(self, db, sample_session):
         """Test exporting as Markdown."""
@@ -304,6 +359,16 @@ class TestMessageHistoryManager:
         assert "# Message History" in markdown
         assert "##" in markdown  # Headers for messages
     
+    def test_export_to_stream(self, db, sample_session):
+        """Test exporting into a caller-provided stream."""
+        session, player, character = sample_session
+        
+        manager = MessageHistoryManager(db)
+        out = io.StringIO()
+        
+        assert manager.export_history(session.id, format="markdown", out=out) is None
+        assert out.getvalue() == manager.export_history(session.id, format="markdown")
+    
     def test_clear_old_messages(self, db, sample_session):
         """Test clearing old messages."""
         session, player, character = sample_session
@@ -334,6 +399,9 @@ class TestStatisticsTracker:
         
         assert stats["total_rolls"] == 5
         assert stats["average_result"] > 0
+        assert stats["by_type"] == {"attack": 5}
+        assert stats["by_die"] == {"d20": 5}
+        assert (stats["lowest_roll"], stats["highest_roll"]) == (15, 19)
     
     def test_get_dice_stats_by_character(self, db, sample_session):
         """Test dice stats filtered by character."""
@@ -355,6 +423,7 @@ class TestStatisticsTracker:
             roll_type="attack",
             formula="1d20",
             result=20,
+            rolls="[20]",
             modifier=0
         )
         db.add(roll)
@@ -400,6 +469,16 @@ class TestStatisticsTracker:
         assert "dice_stats" in stats
         assert "combat_stats" in stats
     
+    def test_get_session_stats_query_count(self, db, sample_session, query_counter):
+        """Test session stats use one aggregate query per table."""
+        session, player, character = sample_session
+        
+        tracker = StatisticsTracker(db)
+        with query_counter() as qc:
+            tracker.get_session_stats(session.id)
+        
+        assert qc.count <= 3
+    
     def test_get_player_activity(self, db, sample_session):
         """Test player activity tracking."""
         session, player, character = sample_session
@@ -409,6 +488,11 @@ class TestStatisticsTracker:
         
         assert activity["period_days"] == 7
         assert activity["total_messages"] >= 10
+        for senders in activity["activity_by_day"].values():
+            assert set(senders) <= {"test_player", "DM"}
+        assert sum(
+            sum(senders.values()) for senders in activity["activity_by_day"].values()
+        ) == activity["total_messages"]
     
     def test_get_leaderboard_messages(self, db, sample_session):
         """Test message leaderboard."""
@@ -430,6 +514,29 @@ class TestStatisticsTracker:
         assert len(rankings) >= 1
         assert rankings[0]["count"] == 5
     
+    def test_get_leaderboard_limit(self, db, sample_session):
+        """Test leaderboard is ranked and limited in SQL."""
+        session, player, character = sample_session
+        
+        tracker = StatisticsTracker(db)
+        rankings = tracker.get_leaderboard(session.id, metric="messages", limit=1)
+        
+        assert len(rankings) == 1
+        assert rankings[0]["rank"] == 1
+    
+    def test_get_leaderboard_ties_ordered_by_name(self, db, sample_session):
+        """Test tied players share a rank and are listed by name."""
+        session, player, character = sample_session
+        
+        tracker = StatisticsTracker(db)
+        rankings = tracker.get_leaderboard(session.id, metric="messages")
+        
+        # The sample data has five messages each from DM and test_player
+        assert rankings == [
+            {"player": "DM", "count": 5, "rank": 1},
+            {"player": "test_player", "count": 5, "rank": 1},
+        ]
+    
     def test_format_stats_report(self, db, sample_session):
         """Test formatting statistics report."""
         session, player, character = sample_session
@@ -607,6 +714,18 @@ class TestAliasManager:
             assert "Movement:" in output
             assert "n" in output
     
+    def test_format_aliases_reflects_changes(self):
+        """Test alias listing reflects aliases added or set directly."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = AliasManager(Path(tmpdir))
+            
+            manager.format_aliases()
+            manager.aliases["direct"] = "direct command"
+            assert "direct command" in manager.format_aliases()
+            
+            manager.add_alias("custom", "custom command")
+            assert "custom command" in manager.format_aliases()
+    
     def test_format_aliases_by_category(self):
         """Test formatting specific category."""
         with tempfile.TemporaryDirectory() as tmpdir:
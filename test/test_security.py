@@ -1,10 +1,11 @@
 """Tests for security middleware and utilities."""
 
-import time
+import json
 import pytest
+from types import SimpleNamespace
 from unittest.mock import Mock, AsyncMock, patch
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
 
 from llm_dungeon_master.security import (
     RateLimiter,
@@ -19,6 +20,47 @@ from llm_dungeon_master.security import (
 )
 
 
+@pytest.fixture(scope="module")
+def api_request():
+    """Lightweight stand-in for a request to an API endpoint."""
+    return SimpleNamespace(
+        url=SimpleNamespace(path="/api/test"),
+        client=SimpleNamespace(host="127.0.0.1")
+    )
+
+
+@pytest.fixture(scope="module")
+def health_request():
+    """Lightweight stand-in for a request to the health check endpoint."""
+    return SimpleNamespace(
+        url=SimpleNamespace(path="/health"),
+        client=SimpleNamespace(host="127.0.0.1")
+    )
+
+
+class FakeClock:
+    """Manually advanced stand-in for time.monotonic_ns."""
+    
+    def __init__(self):
+        self.now = 0
+    
+    def __call__(self) -> int:
+        return self.now
+    
+    def advance(self, seconds: float) -> None:
+        self.now += int(seconds * 1_000_000_000)
+
+
+def make_response(**headers):
+    """Build a real Starlette response carrying the given headers."""
+    return Response(headers=headers)
+
+
+async def call_next(request):
+    """Downstream handler returning a fresh empty response."""
+    return make_response()
+
+
 class TestRateLimiter:
     """Test RateLimiter class."""
     
@@ -53,7 +95,8 @@ class TestRateLimiter:
     
     def test_rate_limiter_tokens_refill(self):
         """Test that tokens refill over time."""
-        limiter = RateLimiter(rate=120, burst=2)  # 2 tokens/second
+        clock = FakeClock()
+        limiter = RateLimiter(rate=120, burst=2, clock=clock)  # 2 tokens/second
         
         # Use both tokens
         limiter.is_allowed("test-key")
@@ -64,7 +107,7 @@ class TestRateLimiter:
         assert allowed is False
         
         # Wait for refill
-        time.sleep(1.1)
+        clock.advance(1.1)
         
         # Should be allowed again
         allowed, _ = limiter.is_allowed("test-key")
@@ -82,73 +125,128 @@ class TestRateLimiter:
         # key2 should still be allowed
         allowed2, _ = limiter.is_allowed("key2")
         assert allowed2 is True
+    
+    def test_rate_limiter_try_acquire_batch(self):
+        """Test taking several tokens at once."""
+        limiter = RateLimiter(rate=60, burst=5, clock=FakeClock())
+        
+        allowed, _ = limiter.try_acquire("test-key", 5)
+        assert allowed is True
+        
+        # Bucket is empty; 3 tokens refill in 3 seconds at 1 token/second
+        allowed, retry_after = limiter.try_acquire("test-key", 3)
+        assert allowed is False
+        assert retry_after == 3
+    
+    def test_rate_limiter_try_acquire_rejects_non_positive(self):
+        """Test that zero or negative token counts are rejected."""
+        limiter = RateLimiter(rate=60, burst=5)
+        
+        for n in (0, -3):
+            with pytest.raises(ValueError):
+                limiter.try_acquire("test-key", n)
+        
+        # No tokens were minted by the rejected calls
+        assert limiter.remaining("test-key") == 5
+    
+    def test_rate_limiter_try_acquire_rejects_over_burst(self):
+        """Test that a request larger than the bucket is rejected up front."""
+        limiter = RateLimiter(rate=60, burst=5)
+        
+        with pytest.raises(ValueError):
+            limiter.try_acquire("test-key", 6)
+    
+    def test_rate_limiter_shard_count(self):
+        """Test shard count is rounded up to a power of two."""
+        assert RateLimiter(shards=1).shard_count == 1
+        assert RateLimiter(shards=6).shard_count == 8
+        
+        limiter = RateLimiter(rate=60, burst=1, shards=4)
+        for key in ("a", "b", "c", "d", "e"):
+            allowed, _ = limiter.is_allowed(key)
+            assert allowed is True
+    
+    def test_rate_limiter_remaining(self):
+        """Test remaining tokens are reported per key."""
+        limiter = RateLimiter(rate=60, burst=3)
+        
+        assert limiter.remaining("test-key") == 3
+        limiter.is_allowed("test-key")
+        assert limiter.remaining("test-key") == 2
+    
+    def test_rate_limiter_cleanup_idle_buckets(self):
+        """Test idle buckets are dropped oldest first."""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=60, burst=5, clock=clock)
+        
+        limiter.is_allowed("old-key")
+        clock.advance(2)
+        limiter.is_allowed("new-key")
+        
+        assert limiter.cleanup_idle_buckets(max_idle=1) == 1
+        assert limiter.remaining("old-key") == 5
+        assert limiter.remaining("new-key") == 4
 
 
 class TestRateLimitMiddleware:
     """Test RateLimitMiddleware class."""
     
     @pytest.mark.asyncio
-    async def test_middleware_allows_requests_under_limit(self):
+    async def test_middleware_allows_requests_under_limit(self, api_request):
         """Test middleware allows requests under rate limit."""
         limiter = RateLimiter(rate=60, burst=10)
         middleware = RateLimitMiddleware(Mock(), limiter)
         
-        request = Mock(spec=Request)
-        request.url.path = "/api/test"
-        request.client.host = "127.0.0.1"
-        
-        async def call_next(req):
-            response = Mock()
-            response.headers = {}
-            return response
-        
-        response = await middleware.dispatch(request, call_next)
+        response = await middleware.dispatch(api_request, call_next)
         assert response is not None
     
     @pytest.mark.asyncio
-    async def test_middleware_blocks_requests_over_limit(self):
+    async def test_middleware_blocks_requests_over_limit(self, api_request):
         """Test middleware blocks requests over rate limit."""
         limiter = RateLimiter(rate=60, burst=1)
         middleware = RateLimitMiddleware(Mock(), limiter)
         
-        request = Mock(spec=Request)
-        request.url.path = "/api/test"
-        request.client.host = "127.0.0.1"
-        
-        async def call_next(req):
-            response = Mock()
-            response.headers = {}
-            return response
-        
         # First request should succeed
-        await middleware.dispatch(request, call_next)
+        await middleware.dispatch(api_request, call_next)
         
         # Second request should be rate limited
-        response = await middleware.dispatch(request, call_next)
+        response = await middleware.dispatch(api_request, call_next)
         assert isinstance(response, JSONResponse)
         assert response.status_code == 429
+        assert json.loads(response.body) == {
+            "error": "Rate limit exceeded",
+            "retry_after": int(response.headers["Retry-After"])
+        }
     
     @pytest.mark.asyncio
-    async def test_middleware_skips_health_checks(self):
+    @pytest.mark.parametrize("cleanup_interval,buckets_left", [(1, 1), (2, 2)])
+    async def test_middleware_sweeps_idle_buckets(
+        self, api_request, cleanup_interval, buckets_left
+    ):
+        """Test middleware drops idle buckets once every cleanup interval."""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=60, burst=5, clock=clock)
+        middleware = RateLimitMiddleware(Mock(), limiter, cleanup_interval=cleanup_interval)
+        
+        limiter.is_allowed("idle-client")
+        clock.advance(10)  # Longer than a full refill
+        await middleware.dispatch(api_request, call_next)
+        
+        # Sweeping everything now counts the buckets the middleware kept
+        assert limiter.cleanup_idle_buckets(max_idle=0) == buckets_left
+    
+    @pytest.mark.asyncio
+    async def test_middleware_skips_health_checks(self, health_request):
         """Test middleware skips rate limiting for health checks."""
         limiter = RateLimiter(rate=60, burst=0)  # No burst tokens
         middleware = RateLimitMiddleware(Mock(), limiter)
         
-        request = Mock(spec=Request)
-        request.url.path = "/health"
-        request.client.host = "127.0.0.1"
-        
-        async def call_next(req):
-            response = Mock()
-            response.headers = {}
-            return response
-        
         # Should succeed even with no burst tokens
-        response = await middleware.dispatch(request, call_next)
+        response = await middleware.dispatch(health_request, call_next)
         assert not isinstance(response, JSONResponse) or response.status_code != 429
     
     @pytest.mark.asyncio
-    async def test_middleware_disabled(self):
+    async def test_middleware_disabled(self, api_request):
         """Test middleware can be disabled."""
         with patch('llm_dungeon_master.security.settings') as mock_settings:
             mock_settings.rate_limit_enabled = False
@@ -156,17 +254,8 @@ class TestRateLimitMiddleware:
             limiter = RateLimiter(rate=60, burst=0)
             middleware = RateLimitMiddleware(Mock(), limiter)
             
-            request = Mock(spec=Request)
-            request.url.path = "/api/test"
-            request.client.host = "127.0.0.1"
-            
-            async def call_next(req):
-                response = Mock()
-                response.headers = {}
-                return response
-            
             # Should succeed even with no burst tokens
-            response = await middleware.dispatch(request, call_next)
+            response = await middleware.dispatch(api_request, call_next)
             assert response is not None
 
 
@@ -174,18 +263,11 @@ class TestSecurityHeadersMiddleware:
     """Test SecurityHeadersMiddleware class."""
     
     @pytest.mark.asyncio
-    async def test_middleware_adds_security_headers(self):
+    async def test_middleware_adds_security_headers(self, api_request):
         """Test middleware adds security headers."""
         middleware = SecurityHeadersMiddleware(Mock())
         
-        request = Mock(spec=Request)
-        
-        async def call_next(req):
-            response = Mock()
-            response.headers = {}
-            return response
-        
-        response = await middleware.dispatch(request, call_next)
+        response = await middleware.dispatch(api_request, call_next)
         
         assert "X-Content-Type-Options" in response.headers
         assert response.headers["X-Content-Type-Options"] == "nosniff"
@@ -195,19 +277,42 @@ class TestSecurityHeadersMiddleware:
         assert "Strict-Transport-Security" in response.headers
     
     @pytest.mark.asyncio
-    async def test_middleware_removes_server_header(self):
+    async def test_middleware_removes_server_header(self, api_request):
         """Test middleware removes server identification header."""
         middleware = SecurityHeadersMiddleware(Mock())
         
-        request = Mock(spec=Request)
+        async def call_next(req):
+            return make_response(server="uvicorn")
+        
+        response = await middleware.dispatch(api_request, call_next)
+        assert "server" not in response.headers
+    
+    @pytest.mark.asyncio
+    async def test_middleware_replaces_existing_security_headers(self, api_request):
+        """Test middleware overrides headers set downstream without duplicating them."""
+        middleware = SecurityHeadersMiddleware(Mock())
+        
+        async def call_next(req):
+            return make_response(**{"X-Frame-Options": "SAMEORIGIN", "X-Custom": "kept"})
+        
+        response = await middleware.dispatch(api_request, call_next)
+        assert response.headers.getlist("X-Frame-Options") == ["DENY"]
+        assert response.headers["X-Custom"] == "kept"
+    
+    @pytest.mark.asyncio
+    async def test_middleware_headers_view_matches_raw_headers(self, api_request):
+        """Test a headers view cached downstream does not go stale."""
+        middleware = SecurityHeadersMiddleware(Mock())
         
         async def call_next(req):
-            response = Mock()
-            response.headers = {"server": "uvicorn"}
+            response = make_response(server="uvicorn")
+            response.headers["X-Custom"] = "kept"
             return response
         
-        response = await middleware.dispatch(request, call_next)
+        response = await middleware.dispatch(api_request, call_next)
         assert "server" not in response.headers
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert response.headers.raw == response.raw_headers
 
 
 class TestInputValidation:
@@ -271,12 +376,20 @@ class TestInputValidation:
         
         with pytest.raises(HTTPException):
             validate_dice_formula("1d")  # Missing sides
+        
+        with pytest.raises(HTTPException):
+            validate_dice_formula("1d20\n")  # Trailing newline
     
     def test_sanitize_string_valid(self):
         """Test sanitizing valid strings."""
         assert sanitize_string("Hello, world!") == "Hello, world!"
         assert sanitize_string("  spaces  ") == "spaces"
     
+    def test_sanitize_string_clean_input_not_copied(self):
+        """Test that clean input is returned as the same object."""
+        text = "Hello, world!"
+        assert sanitize_string(text) is text
+    
     def test_sanitize_string_removes_null_bytes(self):
         """Test that null bytes are removed."""
         result = sanitize_string("test\x00string")
@@ -379,6 +492,30 @@ class TestSessionTokenManager:
             removed = manager.cleanup_expired_tokens()
             assert removed == 3
     
+    def test_token_limit_evicts_oldest(self):
+        """Test that creating tokens past the limit evicts the oldest."""
+        manager = SessionTokenManager(max_tokens=2)
+        
+        first = manager.create_token(session_id=1, player_id=1)
+        second = manager.create_token(session_id=1, player_id=2)
+        third = manager.create_token(session_id=1, player_id=3)
+        
+        assert manager.validate_token(first) is None
+        assert manager.validate_token(second) == (1, 2)
+        assert manager.validate_token(third) == (1, 3)
+    
+    def test_cleanup_keeps_live_tokens(self):
+        """Test that cleanup only removes expired tokens."""
+        manager = SessionTokenManager()
+        token = manager.create_token(session_id=1, player_id=1)
+        
+        with patch('llm_dungeon_master.security.settings') as mock_settings:
+            mock_settings.session_timeout = -1
+            manager.create_token(session_id=2, player_id=2)
+        
+        assert manager.cleanup_expired_tokens() == 1
+        assert manager.validate_token(token) == (1, 1)
+    
     def test_tokens_are_unique(self):
         """Test that each token is unique."""
         manager = SessionTokenManager()
@@ -389,6 +526,21 @@ class TestSessionTokenManager:
         assert token1 != token2
 
 
+# (validator, input, expected result or HTTPException)
+VALIDATOR_CASES = [
+    (validate_session_id, 1, 1),
+    (validate_character_id, 1, 1),
+    (validate_player_id, 1, 1),
+    (validate_dice_formula, "1d20", "1d20"),
+    (sanitize_string, "test", "test"),
+    (validate_session_id, 0, HTTPException),
+    (validate_character_id, -1, HTTPException),
+    (validate_player_id, 0, HTTPException),
+    (validate_dice_formula, "invalid", HTTPException),
+    pytest.param(sanitize_string, "a" * 10000, HTTPException, id="sanitize_string-too-long"),
+]
+
+
 class TestSecurityIntegration:
     """Integration tests for security features."""
     
@@ -404,23 +556,11 @@ class TestSecurityIntegration:
         allowed, _ = limiter.is_allowed(f"user-{session_id}")
         assert allowed is True
     
-    def test_all_validators_work(self):
+    @pytest.mark.parametrize("validator,value,expected", VALIDATOR_CASES)
+    def test_all_validators_work(self, validator, value, expected):
         """Test all input validators work correctly."""
-        # Valid inputs
-        assert validate_session_id(1) == 1
-        assert validate_character_id(1) == 1
-        assert validate_player_id(1) == 1
-        assert validate_dice_formula("1d20") == "1d20"
-        assert sanitize_string("test") == "test"
-        
-        # Invalid inputs
-        with pytest.raises(HTTPException):
-            validate_session_id(0)
-        with pytest.raises(HTTPException):
-            validate_character_id(-1)
-        with pytest.raises(HTTPException):
-            validate_player_id(0)
-        with pytest.raises(HTTPException):
-            validate_dice_formula("invalid")
-        with pytest.raises(HTTPException):
-            sanitize_string("a" * 10000)
+        if expected is HTTPException:
+            with pytest.raises(HTTPException):
+                validator(value)
+        else:
+            assert validator(value) == expected